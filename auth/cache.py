@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Protocol
+from core.config import Settings
+from core.metrics import registry
+from users.models import Role
+
+# Resolved users keyed by token subject, so get_current_user skips the users lookup.
+# Entries are detached snapshots (never live ORM rows) so they are safe across sessions.
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    id: int
+    email: str
+    full_name: str | None
+    role: Role
+
+    @classmethod
+    def from_user(cls, user) -> "CachedUser":
+        return cls(id=user.id, email=user.email, full_name=user.full_name, role=user.role)
+
+
+class UserCacheBackend(Protocol):
+    # A shared backend (e.g. Redis) only has to store plain dicts for a bounded time
+
+    def get(self, key: str) -> dict | None: ...
+
+    def set(self, key: str, value: dict, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class InMemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    def __init__(self, backend: UserCacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, subject: str) -> CachedUser | None:
+        if not self.enabled:
+            return None
+        value = self.backend.get(subject)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedUser(**{**value, "role": Role(value["role"])})
+
+    def set(self, subject: str, user) -> CachedUser:
+        cached = CachedUser.from_user(user)
+        if self.enabled:
+            self.backend.set(subject, {**asdict(cached), "role": cached.role.value}, self.ttl)
+        return cached
+
+    def invalidate(self, *subjects: str | None) -> None:
+        for subject in subjects:
+            if subject:
+                self.backend.delete(subject)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self.backend) if hasattr(self.backend, "__len__") else None,
+        }
+
+
+user_cache = UserCache(InMemoryBackend(Settings.USER_CACHE_MAX_ENTRIES), Settings.USER_CACHE_TTL_SECONDS)
+
+def set_user_cache_backend(backend: UserCacheBackend) -> None:
+    # Swap in a shared store so invalidations reach every worker
+    user_cache.backend = backend
+
+def _collect_user_cache_metrics():
+    stats = user_cache.stats()
+    yield "auth_user_cache_hits_total", "", stats["hits"]
+    yield "auth_user_cache_misses_total", "", stats["misses"]
+    if stats["size"] is not None:
+        yield "auth_user_cache_entries", "", stats["size"]
+
+registry.collectors.append(_collect_user_cache_metrics)
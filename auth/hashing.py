@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from core.config import Settings
+
+# bcrypt runs in a dedicated, size-limited process pool so a burst of logins or
+# signups cannot pin the web workers' CPUs. Only HASH_POOL_WORKERS + HASH_QUEUE_MAX
+# jobs may be in flight; beyond that callers get a 503 instead of queueing forever.
+
+@functools.cache
+def pwd_context():
+    # passlib/bcrypt are imported on the first hash, in whichever process runs it,
+    # so neither web workers nor pool processes pay for them at import
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=Settings.BCRYPT_ROUNDS)
+
+def _hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+def _verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    # Returns a new hash when the stored one uses outdated parameters (needs_update)
+    return pwd_context().verify_and_update(plain, hashed)
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, Settings.HASH_POOL_WORKERS + Settings.HASH_QUEUE_MAX))
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the web worker is multi-threaded by the time we get here
+            _executor = ProcessPoolExecutor(
+                max_workers=Settings.HASH_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+def _submit(fn, *args) -> Future | None:
+    if Settings.HASH_POOL_WORKERS <= 0:
+        return None
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+def _run(fn, *args):
+    future = _submit(fn, *args)
+    return fn(*args) if future is None else future.result()
+
+async def _run_async(fn, *args):
+    future = _submit(fn, *args)
+    if future is None:
+        return await run_in_threadpool(fn, *args)
+    return await asyncio.wrap_future(future)
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return _run(_verify_and_update, plain, hashed)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_and_update_async(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return await _run_async(_verify_and_update, plain, hashed)
+
+def shutdown_hash_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
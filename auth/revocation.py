@@ -0,0 +1,38 @@
+import threading
+import time
+from core.config import Settings
+
+# Compact in-memory denylist. Entries are only kept while a token they could
+# match might still be alive, so the table never outgrows the set of live tokens.
+
+_lock = threading.Lock()
+_revoked_tokens: dict[str, float] = {}  # jti -> token exp
+_revoked_users: dict[int, float] = {}  # user id -> tokens issued at or before this are dead
+
+def _prune(now: float) -> None:
+    for jti in [jti for jti, exp in _revoked_tokens.items() if exp < now]:
+        del _revoked_tokens[jti]
+    horizon = now - Settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    for user_id in [uid for uid, at in _revoked_users.items() if at < horizon]:
+        del _revoked_users[user_id]
+
+def revoke_token(jti: str, exp: float) -> None:
+    now = time.time()
+    with _lock:
+        _prune(now)
+        _revoked_tokens[jti] = exp
+
+def revoke_user(user_id: int) -> None:
+    # Used when a user is deleted or their password changes. Tokens carry a sub-second iat
+    # (auth.utils.create_access_token), so one minted right after this (logging back in)
+    # is told apart from every token minted before it.
+    now = time.time()
+    with _lock:
+        _prune(now)
+        _revoked_users[user_id] = now
+
+def is_revoked(jti: str | None, user_id: int | None, issued_at: float | None) -> bool:
+    if jti is not None and jti in _revoked_tokens:
+        return True
+    revoked_at = _revoked_users.get(user_id) if user_id is not None else None
+    return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
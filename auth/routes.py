@@ -2,11 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from auth.schema import Token
-from auth.services import oauth2_scheme, get_current_user, login_user
+from auth.cache import user_cache
+from auth.services import oauth2_scheme, get_current_user, get_current_admin, login_user, logout_user
 from core.database import get_db
+from core.metrics import InstrumentedRoute
 from users.schema import UserItem  # assuming this is your public user output schema
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=InstrumentedRoute)
 
 @router.post("/login", response_model=Token)
 def login(
@@ -21,6 +23,15 @@ def login(
         )
     return response
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(token: str = Depends(oauth2_scheme)):
+    if not logout_user(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
 @router.get("/users/me", response_model=UserItem)
 def read_users_me(
     current_user = Depends(get_current_user)
@@ -32,3 +43,7 @@ def read_users_me(
             headers={"WWW-Authenticate": "Bearer"}
         )
     return current_user
+
+@router.get("/cache/stats")
+def read_user_cache_stats(_ = Depends(get_current_admin)):
+    return user_cache.stats()
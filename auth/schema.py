@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
@@ -8,9 +9,33 @@ class Token(BaseModel):
     class Config:
         from_attributes = True
 
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int
+
 class TokenData(BaseModel):
     email: str
     role: str
+    user_id: Optional[int] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    # What decode_token hands out: same fields as TokenData without pydantic validation
+    email: str
+    role: str
+    user_id: Optional[int] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+    iat: Optional[float] = None
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # Built purely from verified token claims, no database row behind it
+    id: int
+    email: str
+    role: str
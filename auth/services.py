@@ -1,20 +1,55 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from auth.schema import Token
-from auth.utils import verify_password, create_access_token, decode_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.schema import Token, Principal
+from auth.cache import user_cache
+from auth.revocation import revoke_token
+from auth.utils import verify_and_update, create_access_token, decode_token, verify_stream_token
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from core.database import get_db
+from core.database import get_read_db, get_async_read_db
 from users.models import User as UserItem
-from fastapi import Depends, HTTPException, status
-from users.models import Role
+from fastapi import Depends, HTTPException, Query, status
+from users.models import Role, by_email
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def get_current_user(db: Session = Depends(get_read_db), token: str = Depends(oauth2_scheme)):
     data = decode_token(token)
     if not data:
         return None
-    user = db.query(UserItem).filter(UserItem.email == data.email).first()
-    return user
+    cached = user_cache.get(data.email)
+    if cached:
+        return cached
+    user = db.query(UserItem).filter(by_email(data.email)).first()
+    if not user:
+        return None
+    return user_cache.set(data.email, user)
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    # Stateless: trusts the verified claims, so todo routes never touch the users table
+    data = decode_token(token)
+    if not data or data.user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return Principal(id=data.user_id, email=data.email, role=data.role)
+
+async def get_stream_principal(
+    token: str | None = Query(None, description="Stream token from POST /todos/stream/token, for EventSource"),
+    bearer: str | None = Depends(optional_oauth2_scheme),
+) -> Principal:
+    # A browser EventSource can't set Authorization, so the feed also takes a stream token
+    data = decode_token(bearer) if bearer else verify_stream_token(token) if token else None
+    if not data or data.user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return Principal(id=data.user_id, email=data.email, role=data.role)
 
 def get_current_admin(current_user: UserItem = Depends(get_current_user)):
     if not current_user or current_user.role != Role.admin:
@@ -24,15 +59,50 @@ def get_current_admin(current_user: UserItem = Depends(get_current_user)):
         )
     return current_user
 
+async def get_current_user_async(db: AsyncSession = Depends(get_async_read_db), token: str = Depends(oauth2_scheme)):
+    data = decode_token(token)
+    if not data:
+        return None
+    cached = user_cache.get(data.email)
+    if cached:
+        return cached
+    result = await db.execute(select(UserItem).where(by_email(data.email)))
+    user = result.scalars().first()
+    if not user:
+        return None
+    return user_cache.set(data.email, user)
+
+async def get_current_admin_async(current_user: UserItem = Depends(get_current_user_async)):
+    if not current_user or current_user.role != Role.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
 def validate_user(db: Session, email: str, password: str):
-    user = db.query(UserItem).filter(UserItem.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    user = db.query(UserItem).filter(by_email(email)).first()
+    if not user:
         return None
+    valid, new_hash = verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        # Stored hash predates the current bcrypt cost, upgrade it transparently
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 def login_user(db: Session, form_data: OAuth2PasswordRequestForm):
     user = validate_user(db, form_data.username, form_data.password)
     if not user:
         return {"status_code": 401, "detail": "Incorrect email or password"}
-    access_token = create_access_token(data={"sub": user.email, "role": user.role.value})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role.value})
     return {"access_token": access_token, "token_type": "bearer"}
+
+def logout_user(token: str) -> bool:
+    data = decode_token(token)
+    if not data or not data.jti:
+        return False
+    revoke_token(data.jti, data.exp)
+    return True
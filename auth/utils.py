@@ -1,37 +1,125 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
-from auth.schema import TokenData
+from auth.schema import TokenClaims
+from auth.revocation import is_revoked
+from auth.hashing import hash_password, verify_and_update
 from core.config import Settings
 from fastapi import HTTPException
 
-# Hasher
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hasher (bcrypt runs in the pool from auth.hashing)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return verify_and_update(plain, hashed)[0]
 
 def create_access_token(data: dict) -> str:
     # Add exp, then encode
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=Settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=Settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # iat keeps its fraction (a JWT NumericDate may have one) so revoke_user can tell a token
+    # minted just before a revocation from one minted just after it, within the same second
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, Settings.SECRET_KEY, algorithm=Settings.ALGORITHM)
     return encoded_jwt
 
-def decode_token(token: str) -> TokenData | None:
+# Verified tokens, keyed by a digest of the token. A token is presented on every request
+# for its whole lifetime, so the HMAC check and JSON parse only need to happen once.
+_token_cache: OrderedDict[bytes, TokenClaims] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def _verify_token(token: str) -> TokenClaims | None:
     try:
         payload = jwt.decode(token, Settings.SECRET_KEY, algorithms=[Settings.ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email is None or role is None:
+    except JWTError:
+        return None
+    email: str = payload.get("sub")
+    role: str = payload.get("role")
+    # Scoped tokens (password reset, change feed) are never access tokens
+    if email is None or role is None or payload.get("scope") is not None:
+        return None
+    return TokenClaims(
+        email=email,
+        role=role,
+        user_id=payload.get("uid"),
+        jti=payload.get("jti"),
+        exp=payload.get("exp"),
+        iat=payload.get("iat"),
+    )
+
+def decode_token(token: str) -> TokenClaims | None:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        claims = _token_cache.get(key)
+        if claims is not None:
+            _token_cache.move_to_end(key)
+
+    if claims is None:
+        claims = _verify_token(token)
+        if claims is None:
             return None
-        return TokenData(email=email, role=role)
+        # Tokens without exp are never cached, so an entry can't outlive its token
+        if claims.exp is not None and Settings.TOKEN_CACHE_MAX_ENTRIES > 0:
+            with _token_cache_lock:
+                _token_cache[key] = claims
+                while len(_token_cache) > Settings.TOKEN_CACHE_MAX_ENTRIES:
+                    _token_cache.popitem(last=False)
+    elif claims.exp <= time.time():
+        with _token_cache_lock:
+            _token_cache.pop(key, None)
+        return None
+
+    # Revocation is checked on every call, cached or not
+    if is_revoked(claims.jti, claims.user_id, claims.iat):
+        return None
+    return claims
+
+def scope_claims(scope) -> TokenClaims | None:
+    # Bearer token claims straight from an ASGI scope, for middleware that runs before routing
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return decode_token(token) if scheme.lower() == "bearer" and token else None
+    return None
+
+def create_stream_token(claims) -> str:
+    # Opens GET /todos/stream only: it travels in the URL, so it is short-lived and scoped
+    now = time.time()
+    to_encode = {
+        "sub": claims.email,
+        "uid": claims.id,
+        "role": claims.role,
+        "scope": "todo-stream",
+        "iat": now,
+        "exp": now + Settings.TODO_STREAM_TOKEN_SECONDS,
+    }
+    return jwt.encode(to_encode, Settings.SECRET_KEY, algorithm=Settings.ALGORITHM)
+
+def verify_stream_token(token: str) -> TokenClaims | None:
+    try:
+        payload = jwt.decode(token, Settings.SECRET_KEY, algorithms=[Settings.ALGORITHM])
     except JWTError:
         return None
+    if payload.get("scope") != "todo-stream" or payload.get("uid") is None:
+        return None
+    claims = TokenClaims(
+        email=payload.get("sub"),
+        role=payload.get("role"),
+        user_id=payload.get("uid"),
+        exp=payload.get("exp"),
+        iat=payload.get("iat"),
+    )
+    if is_revoked(None, claims.user_id, claims.iat):
+        return None
+    return claims
+
 def create_password_reset_token(email: str) -> str:
     data = {"sub": email, "scope": "pwd-reset"}
     expire = datetime.utcnow() + timedelta(minutes=15)
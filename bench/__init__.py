@@ -0,0 +1,17 @@
+import os
+
+# Benchmarks run against local stand-ins, so fill in whatever core.config insists on
+# before any app module is imported. Real values from the environment win.
+for _key, _value in {
+    "DATABASE_URL": "sqlite:///./bench.db",
+    "SECRET_KEY": "bench-secret-key-not-for-production",
+    "EMAIL_HOST": "localhost",
+    "EMAIL_PORT": "8025",
+    "EMAIL_USER": "bench",
+    "EMAIL_PASSWORD": "bench",
+    "EMAIL_FROM": "Bench <bench@localhost>",
+    "FRONTEND_URL": "http://localhost:3000",
+    # The load generator is one IP hammering login on purpose
+    "RATE_LIMIT_ENABLED": "False",
+}.items():
+    os.environ.setdefault(_key, _value)
@@ -0,0 +1,127 @@
+"""Bulk export/import benchmark: throughput and server memory for a large todo list.
+
+    python -m bench.export --todos 1000000 --output bench_export.json
+
+Seeds one user with --todos rows, streams GET /todos/export back (NDJSON and CSV), then
+re-imports the NDJSON through POST /todos/import. Server memory is read from /proc, so
+the peak RSS figures are Linux only; the point is that they stay flat as --todos grows.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import insert
+
+from bench import report
+from bench.seed import seed
+from bench.server import start_server
+from core.database import SessionLocal
+from todos.models import Todo
+from todos.reconcile import reconcile
+
+
+def _seed(todos: int, chunk: int = 10000) -> dict:
+    # seed() supplies the user, its token and the first todo; the rest go in chunk by chunk
+    user = seed(users=1, todos_per_user=1)[0]
+    with SessionLocal() as db:
+        for start in range(1, todos, chunk):
+            db.execute(insert(Todo), [
+                {"title": f"Todo {n}", "description": f"Exported todo {n}", "completed": n % 3 == 0, "user_id": user["id"]}
+                for n in range(start, min(start + chunk, todos))
+            ])
+        db.commit()
+    reconcile()
+    return user
+
+
+def _memory_kb(pid: int) -> dict[str, int]:
+    # VmRSS is current, VmHWM the peak since start (or since the last _reset_peak)
+    fields = {}
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        name, _, value = line.partition(":")
+        if name in ("VmRSS", "VmHWM"):
+            fields[name] = int(value.split()[0])
+    return fields
+
+
+def _reset_peak(pid: int) -> None:
+    try:
+        Path(f"/proc/{pid}/clear_refs").write_text("5")
+    except OSError:  # older kernels, or not our process to touch
+        pass
+
+
+def _export(client: httpx.Client, fmt: str, pid: int, destination: Path) -> dict:
+    _reset_peak(pid)
+    before = _memory_kb(pid)
+    started = time.perf_counter()
+    size = 0
+    with client.stream("GET", "/todos/export", params={"format": fmt}) as r:
+        r.raise_for_status()
+        with destination.open("wb") as out:
+            for chunk in r.iter_bytes():
+                size += len(chunk)
+                out.write(chunk)
+    seconds = time.perf_counter() - started
+    return {"seconds": seconds, "bytes": size, "rss_before_kb": before["VmRSS"], "peak_rss_kb": _memory_kb(pid)["VmHWM"]}
+
+
+def _import(client: httpx.Client, source: Path, pid: int) -> dict:
+    def body(chunk_size: int = 1 << 16):
+        with source.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    _reset_peak(pid)
+    before = _memory_kb(pid)
+    started = time.perf_counter()
+    r = client.post("/todos/import", params={"format": "ndjson"}, content=body(),
+                    headers={"Content-Type": "application/x-ndjson"})
+    r.raise_for_status()
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": seconds,
+        "imported": r.json()["imported"],
+        "rss_before_kb": before["VmRSS"],
+        "peak_rss_kb": _memory_kb(pid)["VmHWM"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--todos", type=int, default=1000000)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--workdir", default=".", help="where the exported files are written")
+    parser.add_argument("--output", default="bench_export.json")
+    args = parser.parse_args()
+
+    user = _seed(args.todos)
+    workdir = Path(args.workdir)
+    process = start_server(args.port)
+    results = {}
+    try:
+        headers = {"Authorization": f"Bearer {user['token']}"}
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", headers=headers, timeout=None) as client:
+            for fmt in ("ndjson", "csv"):
+                results[f"export_{fmt}"] = _export(client, fmt, process.pid, workdir / f"bench_export.{fmt}")
+            results["import_ndjson"] = _import(client, workdir / "bench_export.ndjson", process.pid)
+    finally:
+        process.terminate()
+
+    for name, stats in results.items():
+        rows = stats.get("imported", args.todos)
+        mb = stats.get("bytes", (workdir / "bench_export.ndjson").stat().st_size) / 1e6
+        stats["rows_per_s"] = rows / stats["seconds"]
+        stats["mb_per_s"] = mb / stats["seconds"]
+        print(
+            f"{name:<14} {rows} rows in {stats['seconds']:.1f}s  {stats['rows_per_s']:,.0f} rows/s  "
+            f"{stats['mb_per_s']:.1f} MB/s  peak RSS {stats['peak_rss_kb'] / 1024:.0f} MB "
+            f"(from {stats['rss_before_kb'] / 1024:.0f} MB)"
+        )
+
+    report.write_results(args.output, "export", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
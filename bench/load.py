@@ -0,0 +1,141 @@
+"""Load test: boots the app on a local database, seeds it and drives a request mix.
+
+    python -m bench.load --users 200 --todos 50 --concurrency 1,8,32,128 --duration 20
+
+Needs httpx and uvicorn. By default the app runs on SQLite (bench.db); point
+DATABASE_URL at a local Postgres to measure against the real driver.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from bench import report
+from bench.seed import seed, BENCH_PASSWORD
+from bench.server import start_server
+
+# Relative weights of each operation in a mix
+MIXES = {
+    "default": {"list": 45, "get": 15, "create": 15, "update": 15, "delete": 5, "login": 4, "forgot_password": 1},
+    "read-heavy": {"list": 70, "get": 25, "create": 3, "update": 2},
+    "write-heavy": {"list": 20, "create": 35, "update": 35, "delete": 10},
+    # Mostly bcrypt: shows login latency percentiles and hash-pool backpressure under load
+    "auth": {"login": 80, "list": 20},
+}
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, user: dict):
+        self.client = client
+        self.user = user
+        self.headers = {"Authorization": f"Bearer {user['token']}"}
+        self.todo_ids = list(user["todo_ids"])
+
+    async def run(self, op: str) -> int:
+        headers = {**self.headers, "X-Bench-Endpoint": op}
+        if op == "list":
+            r = await self.client.get("/todos/", params={"limit": 20}, headers=headers)
+        elif op == "get":
+            r = await self.client.get(f"/todos/{self._pick()}", headers=headers)
+        elif op == "create":
+            r = await self.client.post("/todos/", json={"title": "bench", "description": "created under load"}, headers=headers)
+            if r.status_code == 201:
+                self.todo_ids.append(r.json()["id"])
+        elif op == "update":
+            r = await self.client.put(f"/todos/{self._pick()}", json={"completed": random.random() < 0.5}, headers=headers)
+        elif op == "delete":
+            todo_id = self.todo_ids.pop(random.randrange(len(self.todo_ids))) if self.todo_ids else 0
+            r = await self.client.delete(f"/todos/{todo_id}", headers=headers)
+        elif op == "login":
+            r = await self.client.post(
+                "/auth/login",
+                data={"username": self.user["email"], "password": BENCH_PASSWORD},
+                headers={"X-Bench-Endpoint": op},
+            )
+        elif op == "forgot_password":
+            r = await self.client.post("/users/forgot-password", params={"email": self.user["email"]}, headers={"X-Bench-Endpoint": op})
+        else:
+            raise ValueError(f"unknown operation {op}")
+        return r.status_code
+
+    def _pick(self) -> int:
+        return random.choice(self.todo_ids) if self.todo_ids else 0
+
+
+async def run_level(base_url: str, users: list[dict], mix: dict, concurrency: int, duration: float) -> dict:
+    ops, weights = zip(*mix.items())
+    latencies: dict[str, list[float]] = {op: [] for op in ops}
+    errors: dict[str, int] = {op: 0 for op in ops}
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker(index: int):
+            vu = VirtualUser(client, users[index % len(users)])
+            while time.perf_counter() < deadline:
+                op = random.choices(ops, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = await vu.run(op)
+                except httpx.HTTPError:
+                    status = 599
+                latencies[op].append(time.perf_counter() - started)
+                if status >= 500 or status in (401, 429):
+                    errors[op] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        queries = (await client.get("/__bench__/queries")).json()
+
+    endpoints = {}
+    for op in ops:
+        stats = report.summarize(latencies[op])
+        stats["errors"] = errors[op]
+        stats["throughput_rps"] = len(latencies[op]) / elapsed
+        counted = queries.get(op)
+        stats["queries_per_request"] = counted["queries"] / counted["requests"] if counted and counted["requests"] else None
+        endpoints[op] = stats
+    total = sum(len(values) for values in latencies.values())
+    return {"concurrency": concurrency, "requests": total, "throughput_rps": total / elapsed, "endpoints": endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--todos", type=int, default=50, help="todos seeded per user")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="comma separated sweep")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default="bench_load.json")
+    args = parser.parse_args()
+
+    print(f"seeding {args.users} users x {args.todos} todos ...")
+    users = seed(args.users, args.todos)
+    server = start_server(args.port)
+    try:
+        levels = []
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            result = asyncio.run(run_level(f"http://127.0.0.1:{args.port}", users, MIXES[args.mix], concurrency, args.duration))
+            levels.append(result)
+            print(f"\nconcurrency {concurrency}: {result['throughput_rps']:.0f} req/s")
+            for op, stats in result["endpoints"].items():
+                qpr = stats["queries_per_request"]
+                print(
+                    f"  {op:<16} {stats['throughput_rps']:8.1f} req/s"
+                    f"  p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  p99 {stats['p99_ms']:7.1f}ms"
+                    f"  q/req {qpr if qpr is None else round(qpr, 2)}  errors {stats['errors']}"
+                )
+    finally:
+        server.terminate()
+        server.join()
+
+    report.write_results(args.output, "load", vars(args), {"levels": levels})
+
+
+if __name__ == "__main__":
+    main()
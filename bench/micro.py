@@ -0,0 +1,109 @@
+"""Micro-benchmarks for the per-request hot spots.
+
+    python -m bench.micro --output bench_micro.json
+"""
+import argparse
+import timeit
+from types import SimpleNamespace
+
+from auth.hashing import _hash, _verify_and_update
+from bench import auth_decode, report
+from core.config import Settings
+from core.compression import ENCODERS
+from core.responses import FastJSONResponse
+from todos import schema
+
+
+def bench_verify_password(repeat: int) -> dict:
+    # Straight bcrypt, no pool hop, at the configured cost
+    hashed = _hash("bench-password")
+    seconds = min(timeit.repeat(lambda: _verify_and_update("bench-password", hashed), number=1, repeat=repeat))
+    return {"rounds": Settings.BCRYPT_ROUNDS, "ms_per_call": seconds * 1000}
+
+
+def _todo_rows(n: int) -> list:
+    # Stand-ins for ORM rows: plain attribute access, like what pydantic used to be handed
+    return [
+        SimpleNamespace(id=i, title=f"Todo {i}", description="Something that needs doing", completed=i % 2 == 0)
+        for i in range(n)
+    ]
+
+
+def bench_list_serialization(sizes: list[int], number: int) -> dict:
+    # "validated": ORM-style objects through TodoListResponse (the old path)
+    # "fast": column dicts straight into FastJSONResponse (what GET /todos/ does now)
+    results = {}
+    for size in sizes:
+        objects = _todo_rows(size)
+        dicts = [vars(row) for row in objects]
+
+        def validated():
+            return schema.TodoListResponse.model_validate({"todos": objects, "next_cursor": None}).model_dump_json()
+
+        def fast():
+            return FastJSONResponse({"todos": dicts, "next_cursor": None}).body
+
+        results[str(size)] = {
+            name: min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+            for name, fn in (("validated_us", validated), ("fast_us", fast))
+        }
+    return results
+
+
+def bench_list_payload(size: int, number: int) -> dict:
+    # Bytes on the wire for one page: every column vs ?fields=id,title,completed, each
+    # identity-encoded and through every available encoder
+    rows = [vars(row) for row in _todo_rows(size)]
+    sparse = [{key: row[key] for key in ("id", "title", "completed")} for row in rows]
+    results = {}
+    for name, todos in (("full", rows), ("sparse", sparse)):
+        body = FastJSONResponse({"todos": todos, "next_cursor": None}).body
+        stats = {"identity_bytes": len(body)}
+        for encoding, encoder in ENCODERS.items():
+
+            def compress():
+                compressor = encoder()
+                return compressor.compress(body) + compressor.finish()
+
+            stats[f"{encoding}_bytes"] = len(compress())
+            stats[f"{encoding}_us"] = min(timeit.repeat(compress, number=number, repeat=5)) / number * 1e6
+        results[name] = stats
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="decode_token calls per timing")
+    parser.add_argument("--bcrypt-repeat", type=int, default=5)
+    parser.add_argument("--sizes", default="10,100,1000", help="TodoListResponse sizes")
+    parser.add_argument("--output", default="bench_micro.json")
+    args = parser.parse_args()
+
+    results = {
+        "decode_token_us": auth_decode.run(args.iterations),
+        "verify_password": bench_verify_password(args.bcrypt_repeat),
+        "todo_list_serialization": bench_list_serialization([int(s) for s in args.sizes.split(",")], number=200),
+        "todo_list_payload": bench_list_payload(100, number=200),
+    }
+
+    decode = results["decode_token_us"]
+    print(f"decode_token        uncached {decode['uncached']:.2f}µs  cached {decode['cached']:.2f}µs")
+    verify = results["verify_password"]
+    print(f"verify_password     {verify['ms_per_call']:.1f}ms at {verify['rounds']} rounds")
+    for size, stats in results["todo_list_serialization"].items():
+        print(
+            f"todo list           {size:>5} items  validated {stats['validated_us']:.1f}µs  "
+            f"fast {stats['fast_us']:.1f}µs  ({stats['validated_us'] / stats['fast_us']:.1f}x)"
+        )
+
+    for name, stats in results["todo_list_payload"].items():
+        encoded = "  ".join(
+            f"{key.removesuffix('_bytes')} {value}B" for key, value in stats.items() if key.endswith("_bytes")
+        )
+        print(f"payload (100 items) {name:<6} {encoded}")
+
+    report.write_results(args.output, "micro", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies: list[float]) -> dict:
+    # Latencies in seconds in, milliseconds out
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(path: str, kind: str, parameters: dict, results: dict) -> None:
+    # One JSON document per run, so two runs can be diffed for regressions
+    document = {
+        "kind": kind,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(document, indent=2))
+    print(f"results written to {path}")
@@ -0,0 +1,66 @@
+import os
+from pathlib import PurePath
+from sqlalchemy import insert, select
+from core.bootstrap import create_schema
+from core.database import Base, get_engine, SessionLocal
+from auth.hashing import _hash
+from auth.utils import create_access_token
+from todos.models import Todo
+from todos.reconcile import reconcile
+from users.models import User, Role
+
+BENCH_PASSWORD = "bench-password"
+
+def ensure_bench_database() -> None:
+    """Refuse to go on unless the database is a dedicated bench one, since seed() drops every table.
+
+    That is a database whose name contains "bench" (the default sqlite:///./bench.db), or any
+    database when BENCH_ALLOW_DROP=1 is set.
+    """
+    url = get_engine().url
+    if "bench" in PurePath(url.database or "").name.lower() or os.getenv("BENCH_ALLOW_DROP") == "1":
+        return
+    raise SystemExit(
+        f"Refusing to drop every table in {url.render_as_string(hide_password=True)}: benchmarks "
+        "reseed from scratch. Use a database whose name contains 'bench', or set BENCH_ALLOW_DROP=1."
+    )
+
+def seed(users: int, todos_per_user: int) -> list[dict]:
+    """Recreate the schema and fill it; returns one dict per user with a ready token and todo ids."""
+    ensure_bench_database()
+    Base.metadata.drop_all(bind=get_engine())
+    create_schema()
+
+    # Every user shares one password, so bcrypt runs once instead of once per user
+    hashed = _hash(BENCH_PASSWORD)
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"email": f"bench{i}@example.com", "hashed_password": hashed, "full_name": f"Bench {i}", "role": Role.user}
+            for i in range(users)
+        ])
+        user_rows = db.execute(select(User.id, User.email).order_by(User.id)).all()
+        for start in range(0, len(user_rows), 100):
+            db.execute(insert(Todo), [
+                {"title": f"Todo {n}", "description": f"Seeded todo {n}", "completed": n % 3 == 0, "user_id": user_id}
+                for user_id, _ in user_rows[start:start + 100]
+                for n in range(todos_per_user)
+            ])
+        db.commit()
+
+    # Rows went in behind the services' back, so build the per-user counters from them
+    reconcile()
+
+    with SessionLocal() as db:
+        todo_ids: dict[int, list[int]] = {}
+        for todo_id, user_id in db.execute(select(Todo.id, Todo.user_id)):
+            todo_ids.setdefault(user_id, []).append(todo_id)
+
+    return [
+        {
+            "id": user_id,
+            "email": email,
+            "token": create_access_token({"sub": email, "uid": user_id, "role": Role.user.value}),
+            "todo_ids": todo_ids.get(user_id, []),
+        }
+        for user_id, email in user_rows
+    ]
@@ -0,0 +1,73 @@
+import contextvars
+import json
+import multiprocessing
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import event
+
+# The app runs in its own process so the load generator doesn't compete with it for the GIL.
+# A thin ASGI wrapper counts SQL statements per request, grouped by the X-Bench-Endpoint
+# header the load generator sends, and serves the totals at /__bench__/queries.
+
+_request_queries: contextvars.ContextVar[list | None] = contextvars.ContextVar("bench_request_queries", default=None)
+
+class QueryCounter:
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: {"requests": 0, "queries": 0})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if scope["path"] == "/__bench__/queries":
+            return await self._report(send)
+
+        headers = dict(scope["headers"])
+        endpoint = headers.get(b"x-bench-endpoint", b"other").decode()
+        counter = [0]
+        token = _request_queries.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            with self.lock:
+                self.totals[endpoint]["requests"] += 1
+                self.totals[endpoint]["queries"] += counter[0]
+
+    async def _report(self, send):
+        with self.lock:
+            body = json.dumps(self.totals).encode()
+            self.totals.clear()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+def _count_statement(*_):
+    # Context vars follow sync endpoints into the threadpool, so this sees the right request
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+def _serve(port: int) -> None:
+    import uvicorn
+    from core.database import engine
+    from main import app
+
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    uvicorn.run(QueryCounter(app), host="127.0.0.1", port=port, log_level="warning")
+
+def start_server(port: int, timeout: float = 30.0) -> multiprocessing.Process:
+    process = multiprocessing.get_context("spawn").Process(target=_serve, args=(port,), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/__bench__/queries", timeout=1.0)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"app did not start on port {port} within {timeout}s")
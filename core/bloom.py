@@ -0,0 +1,31 @@
+import hashlib
+import math
+import threading
+
+# Fixed-size Bloom filter over strings: `in` never misses an added item and is wrong about
+# `error_rate` of the time for others once `capacity` items are in. Items can't be removed.
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str) -> list[int]:
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
@@ -0,0 +1,28 @@
+"""Create the database schema.
+
+    python -m core.bootstrap
+
+Run once per deploy, before starting the API workers; they no longer touch the schema on
+boot. Only missing tables and indexes are created, changes to existing ones still need a
+migration (see README).
+"""
+import time
+from core.database import Base, get_engine
+# Every model module, so all tables are registered on Base.metadata
+import users.models  # noqa: F401
+import todos.models  # noqa: F401
+import mailer.models  # noqa: F401
+import core.idempotency  # noqa: F401
+import jobs.models  # noqa: F401
+
+def create_schema() -> None:
+    Base.metadata.create_all(bind=get_engine())
+
+def main() -> None:
+    started = time.perf_counter()
+    create_schema()
+    url = get_engine().url.render_as_string(hide_password=True)
+    print(f"Schema ready on {url}: {len(Base.metadata.tables)} tables in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import zlib
+from collections import defaultdict
+from starlette.datastructures import Headers, MutableHeaders
+from core.config import Settings
+from core.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# Negotiated response compression. The encoding is picked from Accept-Encoding (brotli when
+# installed and acceptable, else gzip); bodies under COMPRESSION_MIN_BYTES, already-encoded
+# responses and the SSE feed go out untouched. Streaming responses (exports) are compressed
+# chunk by chunk without buffering them.
+
+_COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/")
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(Settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=Settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+# In order of preference when the client weighs them equally
+ENCODERS = {"br": _Brotli, "gzip": _Gzip} if brotli is not None else {"gzip": _Gzip}
+
+def negotiate(accept_encoding: str) -> str | None:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ENCODERS:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+_bytes_in: dict[str, int] = defaultdict(int)
+_bytes_out: dict[str, int] = defaultdict(int)
+
+class _Responder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.compressor = None
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes, more_body: bool) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        # Compressing the SSE feed would hold events back in the compressor's buffer
+        if content_type.startswith("text/event-stream") or not content_type.startswith(_COMPRESSIBLE):
+            return False
+        # A short response that is complete isn't worth the CPU; a stream may still grow
+        return more_body or len(body) >= self.minimum_size
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            return await self.send(message)
+
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        if self.compressor is None:
+            if self.start is None:
+                # Decided on the first chunk to send this response as it is
+                return await self.send(message)
+            start, self.start = self.start, None
+            start["headers"] = list(start.get("headers", []))
+            headers = MutableHeaders(raw=start["headers"])
+            if not self._should_compress(headers, body, more_body):
+                await self.send(start)
+                return await self.send(message)
+
+            self.compressor = ENCODERS[self.encoding]()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # Byte-for-byte different from the identity body, so the ETag can only be weak
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if "content-length" in headers:
+                del headers["content-length"]
+            if not more_body:
+                body = self._compress(body, final=True)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                return await self.send({"type": "http.response.body", "body": body})
+            await self.send(start)
+
+        chunk = self._compress(body, final=not more_body)
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        out = self.compressor.compress(body)
+        if final:
+            out += self.compressor.finish()
+        _bytes_in[self.encoding] += len(body)
+        _bytes_out[self.encoding] += len(out)
+        return out
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = Settings.COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _Responder(send, encoding, self.minimum_size))
+
+def _collect_compression_metrics():
+    for encoding in list(_bytes_in):
+        yield "http_compression_bytes_in_total", f'encoding="{encoding}"', _bytes_in[encoding]
+        yield "http_compression_bytes_out_total", f'encoding="{encoding}"', _bytes_out[encoding]
+
+registry.collectors.append(_collect_compression_metrics)
@@ -4,34 +4,132 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+class _Required:
+  # Read and checked on first access rather than at import, so a process only fails on the
+  # settings it actually uses (the API never touches SMTP, the mail worker never signs JWTs)
+
+  def __set_name__(self, owner, name):
+    self.name = name
+
+  def __get__(self, obj, objtype=None):
+    value = os.getenv(self.name)
+    if not value:
+      raise ValueError(f"{self.name} environment variable is not set.")
+    if obj is not None:
+      obj.__dict__[self.name] = value
+    return value
+
+
 class Settings:
-  DATABASE_URL: str = os.getenv("DATABASE_URL")
-  if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set.")
-  SECRET_KEY: str = os.getenv("SECRET_KEY")
-  if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is not set.")
+  DATABASE_URL: str = _Required()
+  SECRET_KEY: str = _Required()
   ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
   ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
   DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
-  EMAIL_HOST: str = os.getenv("EMAIL_HOST")
-  if not EMAIL_HOST:
-    raise ValueError("EMAIL_HOST environment variable is not set.")
+  # Statements slower than this are logged with their route
+  SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+  METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+  # Connection pool, applied to the primary, every replica and the async engine
+  DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+  DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+  DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+  DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+  DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+  DB_SSLMODE: str = os.getenv("DB_SSLMODE", "require")
+  # Comma-separated read replicas; read-only routes are spread over them round-robin
+  DATABASE_REPLICA_URLS: list[str] = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+  DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+  DB_STICKY_COOKIE: str = os.getenv("DB_STICKY_COOKIE", "db_primary")
+  # Serve todos/users through the async engine instead of the threadpool-bound sync one
+  ASYNC_DB: bool = os.getenv("ASYNC_DB", "False").lower() == "true"
+  ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
+  # Password hashing: bcrypt cost and the process pool it runs in (0 workers = inline)
+  BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+  HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+  HASH_QUEUE_MAX: int = int(os.getenv("HASH_QUEUE_MAX", "32"))
+  # Verified-token cache entries (0 disables it)
+  TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+  # Todo change feed (/todos/stream)
+  TODO_EVENTS_QUEUE_SIZE: int = int(os.getenv("TODO_EVENTS_QUEUE_SIZE", "100"))
+  TODO_EVENTS_REPLAY_SIZE: int = int(os.getenv("TODO_EVENTS_REPLAY_SIZE", "100"))
+  TODO_EVENTS_MAX_USERS: int = int(os.getenv("TODO_EVENTS_MAX_USERS", "10000"))
+  TODO_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("TODO_EVENTS_KEEPALIVE_SECONDS", "15"))
+  # Lifetime of the ?token= a browser EventSource opens the feed with (it can't send headers)
+  TODO_STREAM_TOKEN_SECONDS: int = int(os.getenv("TODO_STREAM_TOKEN_SECONDS", "300"))
+  # Authenticated-user cache, a TTL of 0 disables it
+  USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+  USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+  TODO_BATCH_MAX_ITEMS: int = int(os.getenv("TODO_BATCH_MAX_ITEMS", "500"))
+  # Token-bucket rate limits as "METHOD /path=requests/seconds" rules separated by ";".
+  # "*" is the fallback for every other route. Authenticated callers are limited per
+  # user, anonymous ones per client IP.
+  RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+  RATE_LIMITS: dict[str, str] = {
+    rule.split("=", 1)[0].strip(): rule.split("=", 1)[1].strip()
+    for rule in os.getenv(
+      "RATE_LIMITS",
+      "POST /auth/login=10/60;POST /users/forgot-password=3/300;POST /users/reset-password=10/300;"
+      "POST /users/=10/3600;*=300/60"
+    ).split(";")
+    if "=" in rule
+  }
+  RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+  # Response compression (gzip, or brotli when the package is installed) for bodies of at
+  # least COMPRESSION_MIN_BYTES
+  COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+  COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+  COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+  COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+  # Largest `limit` the admin user list accepts
+  USERS_PAGE_MAX: int = int(os.getenv("USERS_PAGE_MAX", "100"))
+  # Idempotency-Key on create endpoints: how long responses are replayed, how long a claim
+  # by a crashed worker blocks the key, and how long a concurrent duplicate waits before 409
+  IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+  IDEMPOTENCY_LOCK_SECONDS: int = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+  IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+  IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+  # Export / import (/todos/export, /todos/import): rows fetched or inserted per round trip
+  TODO_EXPORT_CHUNK_ROWS: int = int(os.getenv("TODO_EXPORT_CHUNK_ROWS", "1000"))
+  TODO_IMPORT_CHUNK_ROWS: int = int(os.getenv("TODO_IMPORT_CHUNK_ROWS", "1000"))
+  TODO_IMPORT_MAX_ROWS: int = int(os.getenv("TODO_IMPORT_MAX_ROWS", "1000000"))
+  # Bloom filter of registered emails that screens signups before hashing: expected number
+  # of users and the false positive rate at that size
+  SIGNUP_BLOOM_CAPACITY: int = int(os.getenv("SIGNUP_BLOOM_CAPACITY", "1000000"))
+  SIGNUP_BLOOM_ERROR_RATE: float = float(os.getenv("SIGNUP_BLOOM_ERROR_RATE", "0.01"))
+  # Users whose todos the in-process search index keeps (non-Postgres databases only)
+  SEARCH_INDEX_MAX_USERS: int = int(os.getenv("SEARCH_INDEX_MAX_USERS", "1000"))
+  # Background jobs (python -m jobs.worker): runs at once per worker, queue polling, how long
+  # a run may take before another worker takes it over, and retries with backoff
+  JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+  JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+  JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+  JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+  JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+  JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+  # Scheduled maintenance on the job worker; 0 turns a schedule off
+  RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "86400"))
+  IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+  TODO_PURGE_COMPLETED_DAYS: int = int(os.getenv("TODO_PURGE_COMPLETED_DAYS", "0"))
+  # Soft-deleted todos are hard-deleted once older than the retention, PURGE_CHUNK_ROWS per
+  # transaction; deleted users are purged right away by their own job
+  PURGE_INTERVAL_SECONDS: float = float(os.getenv("PURGE_INTERVAL_SECONDS", "3600"))
+  PURGE_CHUNK_ROWS: int = int(os.getenv("PURGE_CHUNK_ROWS", "1000"))
+  SOFT_DELETE_RETENTION_SECONDS: int = int(os.getenv("SOFT_DELETE_RETENTION_SECONDS", "3600"))
+  EMAIL_HOST: str = _Required()
   EMAIL_PORT: int = int(os.getenv("EMAIL_PORT", "587"))
-  if not EMAIL_PORT:
-    raise ValueError("EMAIL_PORT environment variable is not set.")
-  EMAIL_USER: str = os.getenv("EMAIL_USER")
-  if not EMAIL_USER:
-    raise ValueError("EMAIL_USER environment variable is not set.")
-  EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD")
-  if not EMAIL_PASSWORD:
-    raise ValueError("EMAIL_PASSWORD environment variable is not set.")
-  EMAIL_FROM: str = os.getenv("EMAIL_FROM")
-  if not EMAIL_FROM:
-    raise ValueError("EMAIL_FROM environment variable is not set.")
-  FRONTEND_URL: str = os.getenv("FRONTEND_URL")
-  if not FRONTEND_URL:
-    raise ValueError("FRONTEND_URL environment variable is not set.")
+  EMAIL_USER: str = _Required()
+  EMAIL_PASSWORD: str = _Required()
+  EMAIL_FROM: str = _Required()
+  # Outbox delivery (mailer.worker)
+  EMAIL_USE_TLS: bool = os.getenv("EMAIL_USE_TLS", "True").lower() == "true"
+  EMAIL_TIMEOUT_SECONDS: float = float(os.getenv("EMAIL_TIMEOUT_SECONDS", "30"))
+  EMAIL_POOL_SIZE: int = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+  EMAIL_BATCH_SIZE: int = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+  EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+  EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+  EMAIL_DEDUP_WINDOW_SECONDS: float = float(os.getenv("EMAIL_DEDUP_WINDOW_SECONDS", "300"))
+  EMAIL_POLL_INTERVAL_SECONDS: float = float(os.getenv("EMAIL_POLL_INTERVAL_SECONDS", "2"))
+  FRONTEND_URL: str = _Required()
 
 
 Settings = Settings()
@@ -1,16 +1,75 @@
+import itertools
+import threading
+import time
 from .config import Settings
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from .metrics import instrument_engine, registry, TimedQueuePool, TimedAsyncQueuePool
+from fastapi import Request
+from sqlalchemy import create_engine, Insert, Update, Delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-print(Settings.DATABASE_URL)  # before create_engine
+def _is_postgres(url: str) -> bool:
+    return url.startswith("postgres")
 
-engine = create_engine(
-    Settings.DATABASE_URL,
-    echo=Settings.DEBUG,
-    pool_pre_ping=True,
-    connect_args={"sslmode": "require"}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _pool_options() -> dict:
+    return {
+        "pool_size": Settings.DB_POOL_SIZE,
+        "max_overflow": Settings.DB_MAX_OVERFLOW,
+        "pool_timeout": Settings.DB_POOL_TIMEOUT,
+        "pool_recycle": Settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": Settings.DB_POOL_PRE_PING,
+    }
+
+def _make_engine(url: str):
+    connect_args = {}
+    # sslmode is a libpq option; local SQLite databases (tests, benchmarks) reject it
+    if _is_postgres(url) and Settings.DB_SSLMODE:
+        connect_args["sslmode"] = Settings.DB_SSLMODE
+    new_engine = create_engine(
+        url,
+        echo=Settings.DEBUG,
+        poolclass=TimedQueuePool,
+        connect_args=connect_args,
+        **_pool_options()
+    )
+    instrument_engine(new_engine)
+    return new_engine
+
+# Engines are built on first use, not at import: importing a model or a service never
+# touches the database driver, and a worker that boots but never queries pays nothing.
+# `engine` and `replica_engines` stay importable names through the module __getattr__.
+_engine = None
+_replica_engines: list = []
+_replica_cycle = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine, _replica_engines, _replica_cycle
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _replica_engines = [_make_engine(url) for url in Settings.DATABASE_REPLICA_URLS]
+                _replica_cycle = itertools.cycle(_replica_engines) if _replica_engines else None
+                _engine = _make_engine(Settings.DATABASE_URL)
+    return _engine
+
+def get_replica_engines() -> list:
+    get_engine()
+    return _replica_engines
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "replica_engines":
+        return get_replica_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class PrimarySession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return get_engine()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=PrimarySession)
 
 Base = declarative_base()
 
@@ -20,3 +79,189 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# ─────── Read replicas ───────
+
+class RoutingSession(Session):
+    # Reads go to one replica (picked round-robin, then pinned for the session so all reads
+    # in a request see the same snapshot). Writes, locking reads and every statement after
+    # the first write go to the primary.
+
+    def _primary(self):
+        return get_engine()
+
+    def _next_replica(self):
+        return next(_replica_cycle) if _replica_cycle else None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("primary") or self._flushing or isinstance(clause, (Insert, Update, Delete)) \
+                or getattr(clause, "_for_update_arg", None) is not None:
+            self.info["primary"] = True
+            return self._primary()
+        if "replica" not in self.info:
+            primary = self._primary()
+            self.info["replica"] = self._next_replica() or primary
+        return self.info["replica"]
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
+
+# Read-your-writes: after a client writes, its reads stay on the primary for a short
+# window so replica lag never hides the change. Tracked in-process by token and, for the
+# other workers and for anonymous clients, by a cookie set on the write response (see
+# ReadYourWritesMiddleware).
+_sticky_lock = threading.Lock()
+_sticky_until: dict[str, float] = {}
+
+def _sticky_key(request: Request) -> str | None:
+    # Not the client address: behind a proxy or NAT one write would pin everyone sharing it
+    return request.headers.get("authorization")
+
+def mark_sticky(request: Request) -> None:
+    key = _sticky_key(request)
+    if not key or not Settings.DATABASE_REPLICA_URLS:
+        return
+    now = time.monotonic()
+    with _sticky_lock:
+        if len(_sticky_until) > 10000:
+            for stale in [k for k, until in _sticky_until.items() if until < now]:
+                del _sticky_until[stale]
+        _sticky_until[key] = now + Settings.DB_READ_YOUR_WRITES_SECONDS
+
+def is_sticky(request: Request) -> bool:
+    if request.cookies.get(Settings.DB_STICKY_COOKIE):
+        return True
+    key = _sticky_key(request)
+    return key is not None and _sticky_until.get(key, 0) > time.monotonic()
+
+def get_read_db(request: Request):
+    # For read-only routes; falls back to the primary when no replica is configured
+    db = ReadSessionLocal()
+    if is_sticky(request):
+        db.info["primary"] = True
+    try:
+        yield db
+    finally:
+        db.close()
+
+# POST routes that change nothing the replicas serve; they don't need to pin the client
+_NON_WRITING_PATHS = frozenset({"/auth/login", "/auth/logout", "/todos/stream/token"})
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app, exclude_paths: frozenset[str] = _NON_WRITING_PATHS):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS") \
+                or scope["path"] in self.exclude_paths:
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                mark_sticky(request)
+                cookie = (
+                    f"{Settings.DB_STICKY_COOKIE}=1; Max-Age={int(Settings.DB_READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+def _collect_pool_metrics():
+    engines = []
+    if _engine is not None:
+        engines += [("primary", _engine)] + [(f"replica{i}", e) for i, e in enumerate(_replica_engines)]
+    if _async_engine is not None:
+        engines += [("async_primary", _async_engine)]
+        engines += [(f"async_replica{i}", e) for i, e in enumerate(_async_replica_engines)]
+    for name, pooled in engines:
+        pool = pooled.pool
+        labels = f'engine="{name}"'
+        yield "db_pool_size", labels, pool.size()
+        yield "db_pool_checked_out", labels, pool.checkedout()
+        yield "db_pool_checked_in", labels, pool.checkedin()
+        yield "db_pool_overflow", labels, pool.overflow()
+
+registry.collectors.append(_collect_pool_metrics)
+
+# ─────── Async (opt-in via ASYNC_DB) ───────
+
+_ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_url(url: str):
+    # asyncpg does not understand libpq's sslmode, it is passed via connect_args instead
+    parsed = make_url(url)
+    parsed = parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+    return parsed.difference_update_query(["sslmode"])
+
+def _make_async_engine(url):
+    new_engine = create_async_engine(
+        url,
+        echo=Settings.DEBUG,
+        poolclass=TimedAsyncQueuePool,
+        connect_args={"ssl": Settings.DB_SSLMODE} if _is_postgres(Settings.DATABASE_URL) and Settings.DB_SSLMODE else {},
+        **_pool_options()
+    )
+    instrument_engine(new_engine.sync_engine)
+    return new_engine
+
+_async_engine = None
+_async_replica_engines: list = []
+_async_replica_cycle = None
+_async_sessionmaker = None
+_async_read_sessionmaker = None
+
+def get_async_engine():
+    global _async_engine, _async_replica_engines, _async_replica_cycle, _async_sessionmaker, _async_read_sessionmaker
+    if not Settings.ASYNC_DB:
+        raise RuntimeError("Async database is disabled, set ASYNC_DB=true to enable it.")
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                new_engine = _make_async_engine(Settings.ASYNC_DATABASE_URL or _async_url(Settings.DATABASE_URL))
+                _async_replica_engines = [_make_async_engine(_async_url(url)) for url in Settings.DATABASE_REPLICA_URLS]
+                _async_replica_cycle = itertools.cycle(_async_replica_engines) if _async_replica_engines else None
+                _async_sessionmaker = async_sessionmaker(new_engine, expire_on_commit=False, autoflush=False)
+                _async_read_sessionmaker = async_sessionmaker(
+                    sync_session_class=AsyncRoutingSession, expire_on_commit=False, autoflush=False
+                )
+                _async_engine = new_engine
+    return _async_engine
+
+class AsyncRoutingSession(RoutingSession):
+    # RoutingSession over the async engines; an AsyncSession routes through the sync
+    # session it wraps, which has to hand back the async engines' sync_engine
+    def _primary(self):
+        return get_async_engine().sync_engine
+
+    def _next_replica(self):
+        get_async_engine()
+        return next(_async_replica_cycle).sync_engine if _async_replica_cycle else None
+
+def async_session() -> AsyncSession:
+    get_async_engine()
+    return _async_sessionmaker()
+
+def async_read_session(primary: bool = False) -> AsyncSession:
+    get_async_engine()
+    db = _async_read_sessionmaker()
+    if primary:
+        db.info["primary"] = True
+    return db
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    # Async counterpart of get_read_db: replicas, pinned per request, with read-your-writes
+    async with async_read_session(primary=is_sticky(request)) as db:
+        yield db
@@ -0,0 +1,19 @@
+import hashlib
+from fastapi import Request, Response, status
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(":".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix doesn't matter
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
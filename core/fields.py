@@ -0,0 +1,12 @@
+# Sparse fieldsets: `?fields=id,title` narrows a list endpoint to some of its columns, and
+# only those are selected from the database
+
+def sparse_columns(columns: tuple, fields: str | None) -> tuple:
+    if not fields:
+        return columns
+    wanted = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = wanted - {column.key for column in columns}
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    # id always comes back: the next page's cursor is built from it
+    return tuple(column for column in columns if column.key == "id" or column.key in wanted)
@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, and_, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.datastructures import Headers
+from auth.utils import scope_claims
+from core.config import Settings
+from core.database import Base, SessionLocal, get_engine
+from core.metrics import registry
+
+# Idempotency-Key support for the create endpoints. The first request with a key claims it
+# (one INSERT ... ON CONFLICT) and runs; its response is stored for IDEMPOTENCY_TTL_SECONDS
+# and replayed to every retry without running the endpoint again. A duplicate that arrives
+# while the first is still running waits for it (in this worker on an event, across workers
+# by polling the claim) and gets 409 if it takes longer than IDEMPOTENCY_WAIT_SECONDS.
+# Keys are scoped to the route and the caller, and reusing one for a different request
+# body is a 422. 5xx responses are not stored, so those can be retried for real.
+
+IDEMPOTENT_ROUTES = {"POST /todos/", "POST /todos/batch", "POST /users/", "POST /users/invite"}
+MAX_KEY_LENGTH = 255
+_POLL_SECONDS = 0.05
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)  # "<route>|<caller>|<Idempotency-Key>"
+    fingerprint = Column(String(32), nullable=False)
+    # NULL until the first request has finished
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    locked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    content_type: str | None
+    body: bytes
+
+
+class IdempotencyConflict(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyStore:
+    # Finished responses are kept in a per-worker LRU in front of the table, so replays
+    # usually skip the database. Only touched from the event loop, so no lock.
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, tuple[StoredResponse, float]] = OrderedDict()
+        self._running: dict[str, asyncio.Event] = {}
+
+    def _cached(self, key: str) -> StoredResponse | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    def _remember(self, key: str, stored: StoredResponse, expires_at: datetime) -> None:
+        ttl = (expires_at - datetime.utcnow()).total_seconds()
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._cache[key] = (stored, time.monotonic() + ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _check(stored: StoredResponse, fingerprint: str) -> StoredResponse:
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request")
+        return stored
+
+    def _claim(self, key: str, fingerprint: str):
+        # (row, claimed): claimed when the key is now ours, otherwise the row holding it
+        # (None if it was freed in between)
+        now = datetime.utcnow()
+        table = IdempotencyKey
+        dialect = postgresql if get_engine().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(table).values(
+            key=key, fingerprint=fingerprint, locked_at=now,
+            expires_at=now + timedelta(seconds=Settings.IDEMPOTENCY_TTL_SECONDS)
+        )
+        # An expired key is free again, and so is a claim whose worker died before finishing
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.key],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "status_code": None,
+                "content_type": None,
+                "body": None,
+                "locked_at": stmt.excluded.locked_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=or_(
+                table.expires_at <= now,
+                and_(
+                    table.status_code.is_(None),
+                    table.locked_at <= now - timedelta(seconds=Settings.IDEMPOTENCY_LOCK_SECONDS)
+                ),
+            ),
+        ).returning(table.key)
+        with SessionLocal() as db:
+            claimed = db.execute(stmt).first() is not None
+            db.commit()
+            if claimed:
+                return None, True
+            row = db.execute(
+                select(table.fingerprint, table.status_code, table.content_type, table.body, table.expires_at)
+                .where(table.key == key)
+            ).first()
+            return row, False
+
+    async def acquire(self, key: str, fingerprint: str) -> StoredResponse | None:
+        # None means the caller owns the key and must call release() once it has a response
+        deadline = time.monotonic() + Settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self._cached(key)
+            if stored is not None:
+                return self._check(stored, fingerprint)
+
+            running = self._running.get(key)
+            if running is not None:
+                try:
+                    await asyncio.wait_for(running.wait(), max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    raise IdempotencyConflict(409, "A request with this Idempotency-Key is still in progress")
+                continue
+
+            self._running[key] = asyncio.Event()
+            try:
+                row, claimed = await run_in_threadpool(self._claim, key, fingerprint)
+            except BaseException:
+                self._finish(key)
+                raise
+            if claimed:
+                return None
+            self._finish(key)
+
+            if row is not None:
+                if row.fingerprint != fingerprint:
+                    raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request")
+                if row.status_code is not None:
+                    stored = StoredResponse(row.fingerprint, row.status_code, row.content_type, bytes(row.body or b""))
+                    self._remember(key, stored, row.expires_at)
+                    return stored
+            # Claimed by another worker: poll until it finishes
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict(409, "A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(_POLL_SECONDS)
+
+    def _save(self, key: str, stored: StoredResponse | None) -> datetime | None:
+        with SessionLocal() as db:
+            if stored is None:
+                db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                db.commit()
+                return None
+            expires_at = db.scalar(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(status_code=stored.status_code, content_type=stored.content_type, body=stored.body)
+                .returning(IdempotencyKey.expires_at)
+            )
+            db.commit()
+            return expires_at
+
+    async def release(self, key: str, stored: StoredResponse | None) -> None:
+        # Stores the response for replays; None (a 5xx or a crash) frees the key instead
+        try:
+            expires_at = await run_in_threadpool(self._save, key, stored)
+            if stored is not None and expires_at is not None:
+                self._remember(key, stored, expires_at)
+        finally:
+            self._finish(key)
+
+    def _finish(self, key: str) -> None:
+        event = self._running.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+store = IdempotencyStore(Settings.IDEMPOTENCY_CACHE_SIZE)
+_outcomes: dict[str, int] = defaultdict(int)
+
+def purge_expired() -> int:
+    with SessionLocal() as db:
+        purged = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())).rowcount
+        db.commit()
+    return purged
+
+# ─────── Middleware ───────
+
+async def _send_json(send, status_code: int, content: dict, extra_headers: list | None = None) -> None:
+    body = json.dumps(content).encode()
+    await _send(send, status_code, "application/json", body, extra_headers)
+
+async def _send(send, status_code: int, content_type: str | None, body: bytes, extra_headers: list | None = None) -> None:
+    headers = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        headers.append((b"content-type", content_type.encode()))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers + (extra_headers or [])})
+    await send({"type": "http.response.body", "body": body})
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or f"{scope['method']} {scope['path']}" not in IDEMPOTENT_ROUTES:
+            return await self.app(scope, receive, send)
+        idempotency_key = Headers(scope=scope).get("idempotency-key")
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"})
+
+        body = await _read_body(receive)
+        claims = scope_claims(scope)
+        # Anonymous signups can't be told apart by IP (mobile clients move); the fingerprint
+        # check keeps one caller's key from replaying another's different request
+        caller = f"user:{claims.user_id or claims.email}" if claims is not None else "anonymous"
+        key = f"{scope['method']} {scope['path']}|{caller}|{idempotency_key}"
+        fingerprint = hashlib.blake2b(scope.get("query_string", b"") + b"?" + body, digest_size=16).hexdigest()
+
+        try:
+            stored = await store.acquire(key, fingerprint)
+        except IdempotencyConflict as e:
+            _outcomes["conflict"] += 1
+            retry = [(b"retry-after", b"1")] if e.status_code == 409 else []
+            return await _send_json(send, e.status_code, {"detail": e.detail}, retry)
+        if stored is not None:
+            _outcomes["replayed"] += 1
+            return await _send(
+                send, stored.status_code, stored.content_type, stored.body, [(b"idempotent-replayed", b"true")]
+            )
+
+        _outcomes["executed"] += 1
+        status_code, content_type, chunks = 500, None, []
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        finally:
+            ok = status_code < 500
+            await store.release(key, StoredResponse(fingerprint, status_code, content_type, b"".join(chunks)) if ok else None)
+
+def _collect_idempotency_metrics():
+    for outcome, count in list(_outcomes.items()):
+        yield "idempotency_requests_total", f'outcome="{outcome}"', count
+    yield "idempotency_cache_entries", "", len(store)
+
+registry.collectors.append(_collect_idempotency_metrics)
+
+if __name__ == "__main__":
+    print(f"Purged {purge_expired()} expired idempotency keys")
@@ -0,0 +1,240 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Iterable
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.responses import PlainTextResponse
+from core.config import Settings
+
+# Per-request DB and serialization accounting. A RequestStats lives in a context var for the
+# duration of each HTTP request; engine/pool hooks and the route class add to it, the
+# middleware turns it into a Server-Timing header and folds it into /metrics.
+
+logger = logging.getLogger("app.metrics")
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "db_time", "pool_wait", "endpoint_done")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.endpoint_done: float | None = None
+
+    @property
+    def route(self) -> str:
+        # The router fills scope["route"] in place once the request is matched
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+# ─────── SQLAlchemy hooks ───────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= Settings.SLOW_QUERY_MS:
+        registry.slow_queries += 1
+        logger.warning(
+            "slow query (%.1fms) on %s: %s",
+            elapsed * 1000,
+            stats.route if stats else "<no request>",
+            " ".join(statement.split())[:500],
+        )
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _record_pool_wait(started: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += time.perf_counter() - started
+
+class TimedQueuePool(QueuePool):
+    # _do_get is where a checkout blocks when the pool is exhausted
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(started)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(started)
+
+# ─────── Route class ───────
+
+def _mark_endpoint_done(endpoint):
+    # Everything between the endpoint returning and the response starting is
+    # response-model validation plus JSON encoding, i.e. serialization
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    return wrapper
+
+class InstrumentedRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+# ─────── Aggregation ───────
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _RouteTotals:
+    __slots__ = ("count", "duration", "queries", "db_time", "pool_wait", "serialize", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.serialize = 0.0
+        self.buckets = [0] * (len(_BUCKETS) + 1)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes: dict[tuple[str, str], _RouteTotals] = defaultdict(_RouteTotals)
+        self.statuses: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.slow_queries = 0
+        # Other modules' counters, each yielding (metric name, labels, value) when scraped
+        self.collectors: list[Callable[[], Iterable[tuple[str, str, float]]]] = []
+
+    def observe(self, method: str, route: str, status: int, duration: float, stats: RequestStats, serialize: float) -> None:
+        with self.lock:
+            totals = self.routes[(method, route)]
+            totals.count += 1
+            totals.duration += duration
+            totals.queries += stats.queries
+            totals.db_time += stats.db_time
+            totals.pool_wait += stats.pool_wait
+            totals.serialize += serialize
+            totals.buckets[bisect_left(_BUCKETS, duration)] += 1
+            self.statuses[(method, route, status)] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            routes = list(self.routes.items())
+            statuses = list(self.statuses.items())
+            bucket_rows = [(key, list(totals.buckets)) for key, totals in routes]
+
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route, status), count in statuses:
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), buckets in bucket_rows:
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += buckets[-1]
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+        for (method, route), totals in routes:
+            labels = f'method="{method}",route="{route}"'
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {totals.duration}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {totals.count}")
+
+        for name, attr, kind in (
+            ("db_queries_total", "queries", "counter"),
+            ("db_query_seconds_total", "db_time", "counter"),
+            ("db_pool_wait_seconds_total", "pool_wait", "counter"),
+            ("response_serialize_seconds_total", "serialize", "counter"),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            for (method, route), totals in routes:
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {getattr(totals, attr)}')
+
+        lines.append("# TYPE db_slow_queries_total counter")
+        lines.append(f"db_slow_queries_total {self.slow_queries}")
+
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+def metrics_endpoint(request):
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# ─────── Middleware ───────
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        serialize = 0.0
+
+        async def send_with_timing(message):
+            nonlocal status_code, serialize
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status_code = message["status"]
+                if stats.endpoint_done is not None:
+                    serialize = now - stats.endpoint_done
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                    f"pool;dur={stats.pool_wait * 1000:.2f}, "
+                    f"serialize;dur={serialize * 1000:.2f}, "
+                    f"app;dur={(now - started) * 1000:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if scope["path"] != "/metrics":
+                registry.observe(scope["method"], stats.route, status_code, time.perf_counter() - started, stats, serialize)
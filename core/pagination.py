@@ -0,0 +1,47 @@
+import base64
+import json
+
+# Keyset pagination: the cursor is an opaque token wrapping the last id of the previous page
+
+def _encode(key: str, value: int) -> str:
+    raw = json.dumps({key: value}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode(key: str, cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded))[key]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(value, int) or value < 0:
+        raise ValueError("Invalid cursor")
+    return value
+
+def encode_cursor(last_id: int) -> str:
+    return _encode("id", last_id)
+
+def decode_cursor(cursor: str) -> int:
+    return _decode("id", cursor)
+
+# Ranked results (search) have no stable key to seek on, so their cursor wraps an offset
+
+def encode_offset_cursor(offset: int) -> str:
+    return _encode("offset", offset)
+
+def decode_offset_cursor(cursor: str) -> int:
+    return _decode("offset", cursor)
+
+def keyset(stmt, id_column, cursor: str | None, limit: int, descending: bool = False):
+    # Fetch one extra row so we know whether a next page exists without a COUNT
+    if cursor:
+        last_id = decode_cursor(cursor)
+        stmt = stmt.where(id_column < last_id if descending else id_column > last_id)
+    order = id_column.desc() if descending else id_column.asc()
+    return stmt.order_by(order).limit(limit + 1)
+
+def page(rows, limit: int, key=lambda row: row.id):
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
@@ -0,0 +1,120 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Protocol
+from core.config import Settings
+from core.metrics import registry
+from auth.utils import scope_claims
+
+# Token-bucket rate limiting in front of the routers. Each (policy, client) pair owns a
+# bucket holding up to `capacity` tokens that refills at `rate` tokens per second; a request
+# takes one token or is answered 429 with Retry-After. Policies are matched on the exact
+# "METHOD /path" (one dict lookup), falling back to "*".
+
+@dataclass(frozen=True, slots=True)
+class Policy:
+    name: str
+    capacity: float
+    rate: float
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "Policy":
+        requests, seconds = spec.split("/")
+        return cls(name=name, capacity=float(requests), rate=float(requests) / float(seconds))
+
+
+policies = {name: Policy.parse(name, spec) for name, spec in Settings.RATE_LIMITS.items()}
+
+
+class RateLimitStore(Protocol):
+    # A shared store (e.g. Redis running the same arithmetic in a Lua script) lets every
+    # worker draw from one bucket. take() sits on the request path, so it must be fast.
+    # Takes one token: returns 0 if allowed, otherwise seconds until a token is available
+    def take(self, key: str, capacity: float, rate: float) -> float: ...
+
+
+class InMemoryStore:
+    # Per worker. Least recently used buckets are evicted past max_keys; an evicted bucket
+    # comes back full, which only ever errs towards letting a request through.
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()  # key -> [tokens, updated]
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+store: RateLimitStore = InMemoryStore(Settings.RATE_LIMIT_MAX_KEYS)
+_rejected: dict[str, int] = defaultdict(int)
+
+def set_rate_limit_store(new_store: RateLimitStore) -> None:
+    global store
+    store = new_store
+
+def _client_key(scope) -> str:
+    # Valid bearer tokens are limited per user (decode_token is cached, so this is cheap);
+    # anything else, including bad tokens, per client IP
+    claims = scope_claims(scope)
+    if claims is not None:
+        return f"user:{claims.user_id or claims.email}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # CORS preflights are never limited, the real request that follows is
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        policy = policies.get(f"{scope['method']} {scope['path']}") or policies.get("*")
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        wait = store.take(f"{policy.name}|{_client_key(scope)}", policy.capacity, policy.rate)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        _rejected[policy.name] += 1
+        body = json.dumps({"detail": "Too many requests, slow down."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def _collect_rate_limit_metrics():
+    for name, count in list(_rejected.items()):
+        yield "rate_limit_rejected_total", f'policy="{name}"', count
+    if isinstance(store, InMemoryStore):
+        yield "rate_limit_buckets", "", len(store)
+
+registry.collectors.append(_collect_rate_limit_metrics)
@@ -0,0 +1,26 @@
+import enum
+import json
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+
+# Fast path for list endpoints: rows come straight from our own database as plain dicts,
+# so they are encoded as-is instead of being re-validated through the response model.
+# Routes returning a FastJSONResponse keep `response_model` for the OpenAPI schema only.
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is the fallback
+    orjson = None
+
+def _default(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
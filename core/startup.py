@@ -0,0 +1,38 @@
+import logging
+import os
+import time
+
+# Cold-start timing per worker. main.py imports this before anything else and marks each
+# phase; the report is logged once the server has started and kept for /metrics.
+
+logger = logging.getLogger("uvicorn.error")  # next to uvicorn's own "Application startup complete"
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> None:
+        self.mark("server startup")
+        phases = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        logger.info("Worker %d ready in %.0fms (%s)", os.getpid(), self.total * 1000, phases)
+
+        from core.metrics import registry
+        registry.collectors.append(self._collect)
+
+    def _collect(self):
+        for phase, seconds in self.phases:
+            yield "app_startup_seconds", f'phase="{phase}"', seconds
+        yield "app_startup_seconds_total", "", self.total
+
+startup_timer = StartupTimer()
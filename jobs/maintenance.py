@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from core.config import Settings
+from core.database import SessionLocal
+from core.idempotency import purge_expired
+from jobs.models import Job, JobStatus
+from jobs.registry import job, periodic
+from jobs.services import enqueue
+from todos import services as todo_services
+from todos.models import Todo, UserTodoState, live
+from todos.reconcile import reconcile
+from users.models import User
+
+# Housekeeping that used to be run by hand (or not at all), now scheduled on the job worker.
+# An interval of 0 turns a schedule off; the jobs can still be enqueued by name.
+
+@job("todos.reconcile", timeout_seconds=3600)
+def reconcile_todo_counters(chunk: int = 1000) -> None:
+    reconcile(chunk)
+
+@job("todos.purge_completed", timeout_seconds=3600)
+def purge_completed_todos(older_than_days: int, chunk: int = 1000) -> None:
+    # Through the regular batch delete, so counters, versions and the change feed stay right
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(Todo.user_id, Todo.id)
+                .join(User, User.id == Todo.user_id)
+                .where(Todo.completed.is_(True), Todo.updated_at < cutoff, live, User.deleted_at.is_(None))
+                .order_by(Todo.id)
+                .limit(chunk)
+            ).all()
+            if not rows:
+                return
+            by_user: dict[int, list[int]] = {}
+            for user_id, todo_id in rows:
+                by_user.setdefault(user_id, []).append(todo_id)
+            for user_id, todo_ids in by_user.items():
+                todo_services.delete_todos(db, todo_ids, user_id)
+
+# Soft-deleted rows are removed in chunks of PURGE_CHUNK_ROWS, one short transaction each,
+# so a purge never holds locks on (or bloats the WAL with) a whole account at once
+
+def _delete_todos_chunk(db: Session, *where) -> int:
+    ids = select(Todo.id).where(*where).limit(Settings.PURGE_CHUNK_ROWS).scalar_subquery()
+    deleted = db.execute(delete(Todo).where(Todo.id.in_(ids))).rowcount
+    db.commit()
+    return deleted
+
+@job("users.purge", timeout_seconds=3600)
+def purge_user(user_id: int) -> None:
+    # Enqueued by users.services.delete_user. A retry picks up where the last run stopped.
+    with SessionLocal() as db:
+        if db.scalar(select(User.deleted_at).where(User.id == user_id)) is None:
+            return  # already purged, or not deleted
+        while _delete_todos_chunk(db, Todo.user_id == user_id):
+            pass
+        db.execute(delete(UserTodoState).where(UserTodoState.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id, User.deleted_at.is_not(None)))
+        db.commit()
+
+@job("todos.purge_deleted", timeout_seconds=3600)
+def purge_deleted(retention_seconds: int = Settings.SOFT_DELETE_RETENTION_SECONDS) -> None:
+    cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+    with SessionLocal() as db:
+        while _delete_todos_chunk(db, Todo.deleted_at < cutoff):
+            pass
+        # Safety net for deleted users whose purge job was lost or gave up: a finished job
+        # under the same key is put back in the queue rather than blocking the retry
+        user_ids = db.scalars(select(User.id).where(User.deleted_at < cutoff)).all()
+        for user_id in user_ids:
+            enqueue(
+                db, "users.purge", {"user_id": user_id}, key=f"users.purge:{user_id}", requeue_finished=True
+            )
+
+@job("idempotency.purge_expired")
+def purge_idempotency_keys() -> None:
+    purge_expired()
+
+@job("jobs.purge_finished")
+def purge_finished_jobs(older_than_days: int = Settings.JOB_RETENTION_DAYS) -> None:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    with SessionLocal() as db:
+        db.execute(delete(Job).where(Job.status.in_([JobStatus.succeeded, JobStatus.failed]), Job.finished_at < cutoff))
+        db.commit()
+
+periodic("todos.reconcile", Settings.RECONCILE_INTERVAL_SECONDS, priority=-10)
+if Settings.TODO_PURGE_COMPLETED_DAYS > 0:
+    periodic(
+        "todos.purge_completed", 86400, {"older_than_days": Settings.TODO_PURGE_COMPLETED_DAYS}, priority=-10
+    )
+periodic("todos.purge_deleted", Settings.PURGE_INTERVAL_SECONDS, priority=-5)
+periodic("idempotency.purge_expired", Settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, priority=-5)
+periodic("jobs.purge_finished", 86400, priority=-5)
@@ -0,0 +1,32 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index, JSON
+from core.database import Base
+
+class JobStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)  # a handler registered with jobs.registry.job
+    payload = Column(JSON, nullable=False, default=dict)
+    # Higher runs first among jobs that are due
+    priority = Column(Integer, nullable=False, default=0)
+    # Enqueueing a key that already exists is a no-op (periodic runs, one-off dedup)
+    key = Column(String, nullable=True, unique=True)
+    status = Column(Enum(JobStatus), default=JobStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # When a pending job becomes due; while running, when its lease runs out
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at_priority", "status", "run_at", "priority"),
+    )
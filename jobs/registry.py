@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from typing import Callable
+from core.config import Settings
+
+# Job handlers and periodic schedules. Handlers are plain functions taking the job payload
+# as keyword arguments; they open their own sessions. The worker imports HANDLER_MODULES so
+# every handler is registered before it claims anything.
+
+HANDLER_MODULES = ["jobs.maintenance"]
+
+@dataclass(frozen=True, slots=True)
+class JobSpec:
+    name: str
+    fn: Callable[..., None]
+    # Most runs of this job one worker process executes at once
+    concurrency: int
+    max_attempts: int
+    # Lease length. The worker renews it while the run is going (every third of it), so only
+    # a run whose worker stopped renewing (crashed, killed) is handed to another worker
+    timeout_seconds: float
+
+
+@dataclass(frozen=True, slots=True)
+class Schedule:
+    name: str
+    every_seconds: float
+    payload: dict
+    priority: int
+
+
+handlers: dict[str, JobSpec] = {}
+schedules: list[Schedule] = []
+
+def job(
+    name: str,
+    concurrency: int = 1,
+    max_attempts: int = Settings.JOB_MAX_ATTEMPTS,
+    timeout_seconds: float = Settings.JOB_LEASE_SECONDS,
+):
+    def register(fn):
+        handlers[name] = JobSpec(name, fn, concurrency, max_attempts, timeout_seconds)
+        return fn
+    return register
+
+def periodic(name: str, every_seconds: float, payload: dict | None = None, priority: int = 0) -> None:
+    # Enqueued once per interval across all workers (the run's key is the interval slot)
+    if every_seconds > 0:
+        schedules.append(Schedule(name, every_seconds, payload or {}, priority))
@@ -0,0 +1,44 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from jobs.models import Job, JobStatus
+
+def enqueue(
+    db: Session,
+    name: str,
+    payload: dict | None = None,
+    priority: int = 0,
+    run_at: datetime | None = None,
+    key: str | None = None,
+    requeue_finished: bool = False,
+) -> int | None:
+    # Persist the job for jobs.worker; returns its id, or None when `key` was already taken.
+    # With requeue_finished, a job under `key` that already succeeded or failed is reset to
+    # pending instead (it stays a no-op while that job is still queued or running).
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(Job).values(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        run_at=run_at or datetime.utcnow(),
+        key=key,
+    )
+    if requeue_finished:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Job.key],
+            set_={
+                "payload": stmt.excluded.payload,
+                "priority": stmt.excluded.priority,
+                "run_at": stmt.excluded.run_at,
+                "status": JobStatus.pending,
+                "attempts": 0,
+                "last_error": None,
+                "finished_at": None,
+            },
+            where=Job.status.in_([JobStatus.succeeded, JobStatus.failed]),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Job.key])
+    job_id = db.scalar(stmt.returning(Job.id))
+    db.commit()
+    return job_id
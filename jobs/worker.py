@@ -0,0 +1,197 @@
+"""Background job worker.
+
+Run it next to the API and the mail worker (several are safe on Postgres):
+
+    python -m jobs.worker --concurrency 4
+
+Claims due jobs from the `jobs` table, highest priority first, and runs them on a thread
+pool: at most --concurrency at once, and at most each handler's own `concurrency`. Failed
+runs are retried with exponential backoff until the handler's max_attempts. A running job's
+lease is renewed while it runs, so long handlers are never run twice at once; a job whose
+worker died is taken over, and failed once that has used up its max_attempts. Periodic
+schedules (jobs.registry.periodic) are enqueued as their intervals come round. SIGTERM or
+Ctrl-C stops claiming and lets the running jobs finish.
+"""
+import argparse
+import importlib
+import logging
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from core.config import Settings
+from core.database import SessionLocal
+from jobs.models import Job, JobStatus
+from jobs.registry import HANDLER_MODULES, handlers, schedules
+from jobs.services import enqueue
+
+logger = logging.getLogger("jobs.worker")
+
+@dataclass(frozen=True, slots=True)
+class ClaimedJob:
+    # Snapshot of the row: the ORM object expires on commit and must not cross threads
+    id: int
+    name: str
+    payload: dict
+    attempts: int
+
+def _claim(db: Session, free: int, running: Counter) -> list[ClaimedJob]:
+    # SKIP LOCKED lets several workers share the queue. A running job whose lease (run_at)
+    # has passed belonged to a worker that died, so it is claimed again.
+    now = datetime.utcnow()
+    rows = (
+        db.query(Job)
+        .filter(Job.status.in_([JobStatus.pending, JobStatus.running]), Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        # Extra rows so a handler at its concurrency cap doesn't hold back the others
+        .limit(free * 4)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    taken = Counter(running)
+    for row in rows:
+        spec = handlers.get(row.name)
+        if spec is None:
+            row.status = JobStatus.failed
+            row.finished_at = now
+            row.last_error = f"No handler registered for {row.name!r}"
+            logger.error("Job %s: no handler registered for %r", row.id, row.name)
+            continue
+        if row.status == JobStatus.running and row.attempts >= spec.max_attempts:
+            # Lease ran out: its worker died mid-run, every attempt so far (e.g. a handler that
+            # gets the process OOM-killed)
+            row.status = JobStatus.failed
+            row.finished_at = now
+            row.last_error = f"Worker lost the job {row.attempts} times (lease expired)"
+            logger.error("Giving up on job %s (%s): lease expired on attempt %s", row.id, row.name, row.attempts)
+            continue
+        if len(claimed) >= free or taken[row.name] >= spec.concurrency:
+            continue
+        taken[row.name] += 1
+        row.status = JobStatus.running
+        row.attempts += 1
+        row.run_at = now + timedelta(seconds=spec.timeout_seconds)
+        claimed.append(ClaimedJob(row.id, row.name, dict(row.payload or {}), row.attempts))
+    db.commit()
+    return claimed
+
+def _run(job: ClaimedJob) -> float:
+    started = time.perf_counter()
+    handlers[job.name].fn(**job.payload)
+    return time.perf_counter() - started
+
+def _renew_leases(db: Session, jobs) -> None:
+    # Only rows still ours (same attempt, still running) are extended
+    now = datetime.utcnow()
+    for job in jobs:
+        db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == JobStatus.running, Job.attempts == job.attempts)
+            .values(run_at=now + timedelta(seconds=handlers[job.name].timeout_seconds))
+        )
+    db.commit()
+
+def _finish(db: Session, job: ClaimedJob, error: BaseException | None) -> None:
+    now = datetime.utcnow()
+    spec = handlers[job.name]
+    if error is None:
+        values = {"status": JobStatus.succeeded, "finished_at": now, "last_error": None}
+    elif job.attempts >= spec.max_attempts:
+        values = {"status": JobStatus.failed, "finished_at": now, "last_error": repr(error)}
+        logger.error("Giving up on job %s (%s) after %s attempts: %r", job.id, job.name, job.attempts, error)
+    else:
+        # Exponential backoff: base, 2x base, 4x base, ...
+        delay = Settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        values = {"status": JobStatus.pending, "run_at": now + timedelta(seconds=delay), "last_error": repr(error)}
+        logger.warning("Job %s (%s) failed, retrying in %ss: %r", job.id, job.name, delay, error)
+    # Only while the run is still ours: one that overstayed its lease may have been re-claimed
+    db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == JobStatus.running, Job.attempts == job.attempts)
+        .values(**values)
+    )
+    db.commit()
+
+def _enqueue_due_schedules(next_due: dict[str, float]) -> None:
+    # The interval slot is part of the key, so each run is enqueued once however many
+    # workers get here
+    now = time.time()
+    due = [schedule for schedule in schedules if now >= next_due.get(schedule.name, 0)]
+    if not due:
+        return
+    with SessionLocal() as db:
+        for schedule in due:
+            slot = int(now // schedule.every_seconds)
+            enqueue(
+                db,
+                schedule.name,
+                schedule.payload,
+                priority=schedule.priority,
+                run_at=datetime.utcfromtimestamp(slot * schedule.every_seconds),
+                key=f"{schedule.name}@{slot}",
+            )
+            next_due[schedule.name] = (slot + 1) * schedule.every_seconds
+
+def run_worker(
+    concurrency: int = Settings.JOB_WORKER_CONCURRENCY,
+    poll_interval: float = Settings.JOB_POLL_INTERVAL_SECONDS,
+) -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    running: dict[Future, ClaimedJob] = {}
+    next_due: dict[str, float] = {}
+    next_renewal = float("inf")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as executor:
+        while running or not stopping.is_set():
+            claimed = []
+            if not stopping.is_set():
+                _enqueue_due_schedules(next_due)
+                free = concurrency - len(running)
+                if free > 0:
+                    with SessionLocal() as db:
+                        claimed = _claim(db, free, Counter(job.name for job in running.values()))
+                for job in claimed:
+                    running[executor.submit(_run, job)] = job
+                    # Claimed with a full lease; renew before a third of it has gone
+                    next_renewal = min(next_renewal, time.monotonic() + handlers[job.name].timeout_seconds / 3)
+
+            if not running:
+                stopping.wait(poll_interval)
+                continue
+            if time.monotonic() >= next_renewal:
+                with SessionLocal() as db:
+                    _renew_leases(db, running.values())
+                next_renewal = time.monotonic() + min(handlers[job.name].timeout_seconds for job in running.values()) / 3
+            # Straight back to claiming while the queue keeps filling free slots
+            timeout = 0 if claimed and len(running) < concurrency else poll_interval
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    logger.info("Job %s (%s) done in %.2fs", job.id, job.name, future.result())
+                with SessionLocal() as db:
+                    _finish(db, job, error)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=Settings.JOB_WORKER_CONCURRENCY, help="jobs run at once")
+    parser.add_argument("--poll-interval", type=float, default=Settings.JOB_POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_worker(args.concurrency, args.poll_interval)
+
+if __name__ == "__main__":
+    main()
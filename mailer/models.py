@@ -0,0 +1,31 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index
+from core.database import Base
+
+class EmailStatus(enum.Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+class OutboundEmail(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(Text, nullable=False)
+    # Messages sharing a key (e.g. repeated reset requests for one address) collapse into one
+    dedup_key = Column(String, nullable=True)
+    status = Column(Enum(EmailStatus), default=EmailStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_email_outbox_dedup_key_created", "dedup_key", "created_at"),
+    )
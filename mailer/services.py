@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from core.config import Settings
+from mailer.models import OutboundEmail, EmailStatus
+
+def enqueue_email(db: Session, to: str, subject: str, html_body: str, dedup_key: str | None = None) -> OutboundEmail | None:
+    # Persist the message for the delivery worker instead of talking SMTP in the request
+    if dedup_key:
+        since = datetime.utcnow() - timedelta(seconds=Settings.EMAIL_DEDUP_WINDOW_SECONDS)
+        recent = (
+            db.query(OutboundEmail)
+            .filter(OutboundEmail.dedup_key == dedup_key, OutboundEmail.created_at >= since)
+            .order_by(OutboundEmail.id.desc())
+            .first()
+        )
+        if recent and recent.status == EmailStatus.pending:
+            # Still queued: send the newest content once rather than a second message
+            recent.subject = subject
+            recent.html_body = html_body
+            db.commit()
+            return recent
+        if recent and recent.status in (EmailStatus.sending, EmailStatus.sent):
+            return None
+
+    message = OutboundEmail(to=to, subject=subject, html_body=html_body, dedup_key=dedup_key)
+    db.add(message)
+    db.commit()
+    return message
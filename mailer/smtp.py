@@ -0,0 +1,61 @@
+import queue
+import smtplib
+from contextlib import contextmanager
+from core.config import Settings
+
+class SMTPPool:
+    # A few long-lived, already authenticated connections, so a batch of messages
+    # costs one TCP + STARTTLS + AUTH handshake per connection instead of per message.
+
+    def __init__(self, size: int = Settings.EMAIL_POOL_SIZE):
+        self.size = size
+        self._idle: queue.LifoQueue[smtplib.SMTP] = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(Settings.EMAIL_HOST, Settings.EMAIL_PORT, timeout=Settings.EMAIL_TIMEOUT_SECONDS)
+        if Settings.EMAIL_USE_TLS:
+            server.starttls()
+        if Settings.EMAIL_USER and Settings.EMAIL_PASSWORD:
+            server.login(Settings.EMAIL_USER, Settings.EMAIL_PASSWORD)
+        return server
+
+    @contextmanager
+    def connection(self):
+        try:
+            server = self._idle.get_nowait()
+        except queue.Empty:
+            server = self._connect()
+        try:
+            yield server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Broken connection, drop it so the next caller reconnects
+            self._discard(server)
+            raise
+        else:
+            try:
+                self._idle.put_nowait(server)
+            except queue.Full:
+                self._discard(server)
+
+    def send(self, message) -> None:
+        try:
+            with self.connection() as server:
+                server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get closed by the server; retry once on a fresh one
+            with self.connection() as server:
+                server.send_message(message)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
@@ -0,0 +1,100 @@
+"""Email delivery worker.
+
+Run it next to the API (one is enough, more are safe on Postgres):
+
+    python -m mailer.worker
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from core.config import Settings
+from core.database import SessionLocal
+from mailer.models import OutboundEmail, EmailStatus
+from mailer.smtp import SMTPPool
+from utils.email import build_message
+
+logger = logging.getLogger("mailer.worker")
+
+# A claimed message that is still "sending" after this long belonged to a worker that died
+_LEASE = timedelta(minutes=5)
+
+def _claim_batch(db: Session, batch_size: int) -> list[tuple[OutboundEmail, dict]]:
+    # SKIP LOCKED lets several workers drain the outbox without double-sending
+    now = datetime.utcnow()
+    batch = (
+        db.query(OutboundEmail)
+        .filter(
+            OutboundEmail.status.in_([EmailStatus.pending, EmailStatus.sending]),
+            OutboundEmail.next_attempt_at <= now
+        )
+        .order_by(OutboundEmail.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for message in batch:
+        message.status = EmailStatus.sending
+        message.attempts += 1
+        message.next_attempt_at = now + _LEASE
+        # Snapshot now: the rows expire on commit and the send threads must not lazy-load
+        claimed.append((message, {
+            "id": message.id,
+            "to": message.to,
+            "attempts": message.attempts,
+            "mime": build_message(message.to, message.subject, message.html_body),
+        }))
+    db.commit()
+    return claimed
+
+def _deliver(pool: SMTPPool, snapshot: dict) -> Exception | None:
+    try:
+        pool.send(snapshot["mime"])
+    except Exception as e:
+        return e
+    return None
+
+def deliver_pending(db: Session, pool: SMTPPool, batch_size: int = Settings.EMAIL_BATCH_SIZE) -> int:
+    claimed = _claim_batch(db, batch_size)
+    if not claimed:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        errors = list(executor.map(lambda item: _deliver(pool, item[1]), claimed))
+
+    now = datetime.utcnow()
+    for (message, snapshot), error in zip(claimed, errors):
+        if error is None:
+            message.status = EmailStatus.sent
+            message.sent_at = now
+            message.last_error = None
+        elif snapshot["attempts"] >= Settings.EMAIL_MAX_ATTEMPTS:
+            message.status = EmailStatus.failed
+            message.last_error = str(error)
+            logger.error("Giving up on email %s to %s: %s", snapshot["id"], snapshot["to"], error)
+        else:
+            # Exponential backoff: base, 2x base, 4x base, ...
+            delay = Settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (snapshot["attempts"] - 1)
+            message.status = EmailStatus.pending
+            message.next_attempt_at = now + timedelta(seconds=delay)
+            message.last_error = str(error)
+            logger.warning("Email %s to %s failed, retrying in %ss: %s", snapshot["id"], snapshot["to"], delay, error)
+    db.commit()
+    return len(claimed)
+
+def run_worker(poll_interval: float = Settings.EMAIL_POLL_INTERVAL_SECONDS) -> None:
+    pool = SMTPPool()
+    try:
+        while True:
+            with SessionLocal() as db:
+                sent = deliver_pending(db, pool)
+            if not sent:
+                time.sleep(poll_interval)
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_worker()
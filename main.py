@@ -1,15 +1,45 @@
+from core.startup import startup_timer  # first, so the imports below are timed
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from todos.routes import router as todo_routes
 from auth.routes import router as auth_routes
-from users.routes import router as user_routes
-from core.database import engine, Base
+from auth.hashing import shutdown_hash_pool
+from core.compression import CompressionMiddleware
+from core.config import Settings
+from core.database import ReadYourWritesMiddleware
+from core.idempotency import IdempotencyMiddleware
+from core.metrics import MetricsMiddleware, metrics_endpoint
+from core.ratelimit import RateLimitMiddleware
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Sync routers stay the default so both paths can be benchmarked side by side
+if Settings.ASYNC_DB:
+    from todos.async_routes import router as todo_routes
+    from users.async_routes import router as user_routes
+else:
+    from todos.routes import router as todo_routes
+    from users.routes import router as user_routes
 
+startup_timer.mark("imports")
+
+# The schema is created by `python -m core.bootstrap`, not on every worker boot
 app = FastAPI()
 
+@app.on_event("startup")
+def report_startup():
+    startup_timer.report()
+
+@app.on_event("shutdown")
+def stop_hash_pool():
+    shutdown_hash_pool()
+
+# Replays of create requests carrying an Idempotency-Key; innermost, so replays are still
+# rate limited and compressed like any other response
+app.add_middleware(IdempotencyMiddleware)
+
+# Token-bucket limits per user / client IP (Settings.RATE_LIMITS). Added before CORS so
+# 429 responses still carry CORS headers
+if Settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # CORS configuration
 origins = [
     "http://localhost:3000",  # React or Next.js dev server
@@ -23,9 +53,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],                # Allows all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],                # Allows all headers
+    expose_headers=["ETag", "Server-Timing", "Retry-After", "Idempotent-Replayed"],
 )
 
+# Keeps a client's reads on the primary for a moment after it writes (read replicas only)
+if Settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-request query count / DB time / serialization time, as Server-Timing and /metrics
+if Settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# gzip/brotli by Accept-Encoding; added last so it is outermost and compresses every response
+if Settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Include all routers
 app.include_router(todo_routes)  # ✅ Correct usage
 app.include_router(auth_routes)  # ✅ Correct usage
 app.include_router(user_routes)  # ✅ Correct usage
+
+startup_timer.mark("app")
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read when core.config is imported, so the test environment goes in first:
+# a throwaway SQLite database and stand-ins for everything core.config insists on.
+# Real values from the environment win, e.g. DATABASE_URL pointing at a local Postgres.
+_workdir = tempfile.mkdtemp(prefix="todo-tests-")
+for _key, _value in {
+    "DATABASE_URL": f"sqlite:///{_workdir}/test.db",
+    "SECRET_KEY": "test-secret-key-not-for-production",
+    "EMAIL_HOST": "localhost",
+    "EMAIL_PORT": "8025",
+    "EMAIL_USER": "test",
+    "EMAIL_PASSWORD": "test",
+    "EMAIL_FROM": "Todo Tests <tests@localhost>",
+    "EMAIL_USE_TLS": "False",
+    "FRONTEND_URL": "http://localhost:3000",
+    "RATE_LIMIT_ENABLED": "False",
+    # bcrypt inline and cheap: tests care about behaviour, not hash cost
+    "HASH_POOL_WORKERS": "0",
+    "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+
+@pytest.fixture
+def db():
+    # Fresh schema per test, and a session on it
+    pytest.importorskip("sqlalchemy")
+    from core.bootstrap import create_schema
+    from core.database import Base, SessionLocal, get_engine
+
+    Base.metadata.drop_all(bind=get_engine())
+    create_schema()
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def user(db) -> dict:
+    # A registered user and a ready bearer token, without going through signup
+    from auth.hashing import _hash
+    from auth.utils import create_access_token
+    from users.schema import UserCreate
+    from users.services import insert_user
+
+    created = insert_user(db, UserCreate(email="alice@example.com", password="alice-password"), _hash("alice-password"))
+    token = create_access_token({"sub": created["email"], "uid": created["id"], "role": created["role"].value})
+    return {**created, "token": token, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+@pytest.fixture
+def client(db):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
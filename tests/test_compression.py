@@ -0,0 +1,49 @@
+import asyncio
+import gzip
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from core.compression import CompressionMiddleware
+
+
+def _stream_app(chunks: list[bytes]):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/csv; charset=utf-8")],
+        })
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def _call(app, accept_encoding: bytes) -> tuple[dict, bytes]:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=500)(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def test_streamed_response_is_compressed_end_to_end():
+    chunks = [b"id,title\n"] + [f"{n},Todo {n}\n".encode() for n in range(3)]
+    headers, body = _call(_stream_app(chunks), b"gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+def test_small_complete_response_is_left_alone():
+    headers, body = _call(_stream_app([b"id,title\n"]), b"gzip")
+    assert "content-encoding" not in headers
+    assert body == b"id,title\n"
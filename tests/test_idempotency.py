@@ -0,0 +1,179 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from core import idempotency
+from core.config import Settings
+from core.database import SessionLocal
+from core.idempotency import IdempotencyKey, IdempotencyMiddleware, IdempotencyStore
+
+
+class _Endpoint:
+    # Stands in for POST /todos/: counts real executions and can be made slow or failing
+    def __init__(self, delay: float = 0.0, status: int = 201):
+        self.calls = 0
+        self.delay = delay
+        self.status = status
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        request = await receive()
+        await asyncio.sleep(self.delay)
+        body = json.dumps({"call": self.calls, "echo": json.loads(request["body"] or b"null")}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def _post(app, key: str | None, body: dict) -> tuple[int, dict, dict]:
+    headers = [(b"content-type", b"application/json")]
+    if key is not None:
+        headers.append((b"idempotency-key", key.encode()))
+    scope = {"type": "http", "method": "POST", "path": "/todos/", "query_string": b"", "headers": headers}
+    payload = json.dumps(body).encode()
+    sent = False
+    messages = []
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    response_body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], response_headers, json.loads(response_body)
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(db, monkeypatch):
+    # The per-worker LRU would otherwise carry responses from one test into the next
+    monkeypatch.setattr(idempotency, "store", IdempotencyStore(Settings.IDEMPOTENCY_CACHE_SIZE))
+
+
+def test_retry_is_replayed_without_running_again():
+    endpoint = _Endpoint()
+    app = IdempotencyMiddleware(endpoint)
+
+    async def scenario():
+        first = await _post(app, "key-1", {"title": "milk"})
+        second = await _post(app, "key-1", {"title": "milk"})
+        return first, second
+
+    (status1, headers1, body1), (status2, headers2, body2) = asyncio.run(scenario())
+    assert endpoint.calls == 1
+    assert (status1, body1) == (status2, body2) == (201, {"call": 1, "echo": {"title": "milk"}})
+    assert "idempotent-replayed" not in headers1
+    assert headers2["idempotent-replayed"] == "true"
+
+
+def test_replay_survives_the_worker_cache(monkeypatch):
+    # A retry landing on another worker finds the stored response in the table
+    endpoint = _Endpoint()
+    app = IdempotencyMiddleware(endpoint)
+    asyncio.run(_post(app, "key-1", {"title": "milk"}))
+    monkeypatch.setattr(idempotency, "store", IdempotencyStore(Settings.IDEMPOTENCY_CACHE_SIZE))
+
+    status, headers, body = asyncio.run(_post(app, "key-1", {"title": "milk"}))
+    assert endpoint.calls == 1
+    assert status == 201 and body["call"] == 1
+    assert headers["idempotent-replayed"] == "true"
+
+
+def test_concurrent_duplicates_execute_once():
+    endpoint = _Endpoint(delay=0.2)
+    app = IdempotencyMiddleware(endpoint)
+
+    async def scenario():
+        return await asyncio.gather(_post(app, "key-1", {"title": "milk"}), _post(app, "key-1", {"title": "milk"}))
+
+    results = asyncio.run(scenario())
+    assert endpoint.calls == 1
+    assert [body for _, _, body in results] == [{"call": 1, "echo": {"title": "milk"}}] * 2
+    assert sorted("idempotent-replayed" in headers for _, headers, _ in results) == [False, True]
+
+
+def test_duplicate_gets_409_after_the_wait(monkeypatch):
+    monkeypatch.setattr(Settings, "IDEMPOTENCY_WAIT_SECONDS", 0.1)
+    endpoint = _Endpoint(delay=0.5)
+    app = IdempotencyMiddleware(endpoint)
+
+    async def scenario():
+        first = asyncio.create_task(_post(app, "key-1", {"title": "milk"}))
+        await asyncio.sleep(0.05)
+        second = await _post(app, "key-1", {"title": "milk"})
+        return await first, second
+
+    (status1, _, _), (status2, headers2, body2) = asyncio.run(scenario())
+    assert endpoint.calls == 1
+    assert status1 == 201
+    assert status2 == 409
+    assert headers2["retry-after"] == "1"
+    assert "in progress" in body2["detail"]
+
+
+def test_key_reused_for_another_body_is_422():
+    endpoint = _Endpoint()
+    app = IdempotencyMiddleware(endpoint)
+    asyncio.run(_post(app, "key-1", {"title": "milk"}))
+
+    status, _, body = asyncio.run(_post(app, "key-1", {"title": "bread"}))
+    assert status == 422
+    assert endpoint.calls == 1
+    assert "different request" in body["detail"]
+
+
+def test_server_error_frees_the_key():
+    endpoint = _Endpoint(status=503)
+    app = IdempotencyMiddleware(endpoint)
+    assert asyncio.run(_post(app, "key-1", {"title": "milk"}))[0] == 503
+
+    endpoint.status = 201
+    status, headers, body = asyncio.run(_post(app, "key-1", {"title": "milk"}))
+    assert endpoint.calls == 2
+    assert status == 201 and body["call"] == 2
+    assert "idempotent-replayed" not in headers
+
+
+def test_expired_lock_is_taken_over():
+    # A claim left behind by a worker that died mid-request
+    endpoint = _Endpoint()
+    app = IdempotencyMiddleware(endpoint)
+    asyncio.run(_post(app, "other-key", {"title": "warm up"}))
+    with SessionLocal() as session:
+        stale = datetime.utcnow() - timedelta(seconds=Settings.IDEMPOTENCY_LOCK_SECONDS + 1)
+        fingerprint = session.query(IdempotencyKey.fingerprint).scalar()
+        session.add(IdempotencyKey(
+            key="POST /todos/|anonymous|key-1",
+            fingerprint=fingerprint,
+            locked_at=stale,
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        ))
+        session.commit()
+
+    status, headers, body = asyncio.run(_post(app, "key-1", {"title": "warm up"}))
+    assert status == 201
+    assert endpoint.calls == 2
+    assert "idempotent-replayed" not in headers
+
+
+def test_requests_without_a_key_are_untouched():
+    endpoint = _Endpoint()
+    app = IdempotencyMiddleware(endpoint)
+    asyncio.run(_post(app, None, {"title": "milk"}))
+    asyncio.run(_post(app, None, {"title": "milk"}))
+    assert endpoint.calls == 2
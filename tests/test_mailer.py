@@ -0,0 +1,131 @@
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+
+from core.config import Settings
+from mailer.models import EmailStatus, OutboundEmail
+from mailer.services import enqueue_email
+from mailer.smtp import SMTPPool
+from mailer.worker import deliver_pending
+
+
+class _Inbox:
+    # aiosmtpd handler: keeps what it receives and can turn away the next few messages
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+        self.fail_next = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.add(session.peer)
+        if self.fail_next:
+            self.fail_next -= 1
+            return "451 4.3.0 Try again later"
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    # Local stand-in SMTP server: plain text, no auth
+    handler = _Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    monkeypatch.setattr(Settings, "EMAIL_HOST", controller.hostname)
+    monkeypatch.setattr(Settings, "EMAIL_PORT", controller.port)
+    monkeypatch.setattr(Settings, "EMAIL_USE_TLS", False)
+    monkeypatch.setattr(Settings, "EMAIL_USER", "")
+    try:
+        yield handler
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def pool():
+    smtp_pool = SMTPPool(size=2)
+    try:
+        yield smtp_pool
+    finally:
+        smtp_pool.close()
+
+
+def _outbox(db) -> list[OutboundEmail]:
+    db.expire_all()
+    return db.query(OutboundEmail).order_by(OutboundEmail.id).all()
+
+
+def test_delivers_in_batches_over_pooled_connections(db, inbox, pool):
+    for n in range(5):
+        enqueue_email(db, f"user{n}@example.com", f"Message {n}", f"<p>Message {n}</p>")
+
+    assert [deliver_pending(db, pool, batch_size=2) for _ in range(4)] == [2, 2, 1, 0]
+    assert sorted(envelope.rcpt_tos[0] for envelope in inbox.messages) == [f"user{n}@example.com" for n in range(5)]
+    # Connections are reused across batches rather than opened per message
+    assert len(inbox.peers) <= pool.size
+    assert {message.status for message in _outbox(db)} == {EmailStatus.sent}
+
+
+def test_failed_send_is_retried_with_backoff(db, inbox, pool, monkeypatch):
+    monkeypatch.setattr(Settings, "EMAIL_RETRY_BASE_SECONDS", 30)
+    inbox.fail_next = 2
+    enqueue_email(db, "bob@example.com", "Hello", "<p>Hello</p>")
+
+    delays = []
+    for _ in range(2):
+        started = datetime.utcnow()
+        assert deliver_pending(db, pool) == 1
+        [message] = _outbox(db)
+        assert message.status == EmailStatus.pending
+        assert "451" in message.last_error
+        delays.append((message.next_attempt_at - started).total_seconds())
+        # Not due yet: nothing is claimed until the backoff has passed
+        assert deliver_pending(db, pool) == 0
+        message.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    assert 30 <= delays[0] < 32
+    assert 60 <= delays[1] < 62
+
+    assert deliver_pending(db, pool) == 1
+    [message] = _outbox(db)
+    assert message.status == EmailStatus.sent
+    assert message.attempts == 3
+    assert len(inbox.messages) == 1
+
+
+def test_gives_up_after_max_attempts(db, inbox, pool, monkeypatch):
+    monkeypatch.setattr(Settings, "EMAIL_MAX_ATTEMPTS", 1)
+    inbox.fail_next = 1
+    enqueue_email(db, "bob@example.com", "Hello", "<p>Hello</p>")
+
+    assert deliver_pending(db, pool) == 1
+    [message] = _outbox(db)
+    assert message.status == EmailStatus.failed
+    assert deliver_pending(db, pool) == 0
+
+
+def test_repeated_reset_requests_send_one_email(client, db, user, inbox, pool):
+    for _ in range(3):
+        r = client.post("/users/forgot-password", params={"email": user["email"]})
+        assert r.status_code == 202
+    [queued] = _outbox(db)
+    assert queued.dedup_key == f"pwd-reset:{user['email']}"
+
+    assert deliver_pending(db, pool) == 1
+    # Within EMAIL_DEDUP_WINDOW_SECONDS of the sent message: nothing new is queued
+    assert client.post("/users/forgot-password", params={"email": user["email"]}).status_code == 202
+    assert len(_outbox(db)) == 1
+    assert deliver_pending(db, pool) == 0
+    assert [envelope.rcpt_tos for envelope in inbox.messages] == [[user["email"]]]
@@ -0,0 +1,81 @@
+import contextvars
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import event
+
+from core.database import get_engine
+from todos import schema, services
+
+# Statements per request. Todo writes are a single DML ... RETURNING; off Postgres the
+# per-user state bump needs its own statement, and an update that changes `completed`
+# reads the old value first (for the stats counters).
+BUDGETS = {
+    "postgresql": {"create": 1, "update": 1, "delete": 1, "list": 2, "get": 1, "stats": 1, "signup": 2},
+    "sqlite": {"create": 2, "update": 3, "delete": 2, "list": 2, "get": 1, "stats": 1, "signup": 2},
+}
+
+CALLS = {
+    "create": ("POST", "/todos/", {"json": {"title": "budget", "description": "statement budget"}}),
+    "update": ("PUT", "/todos/{todo_id}", {"json": {"completed": True}}),
+    "get": ("GET", "/todos/{todo_id}", {}),
+    "list": ("GET", "/todos/", {"params": {"limit": 20}}),
+    "stats": ("GET", "/todos/stats", {}),
+    "delete": ("DELETE", "/todos/{todo_id}", {}),
+    "signup": ("POST", "/users/", {"json": {"email": "budget@example.com", "password": "budget-password"}}),
+}
+
+_statements: contextvars.ContextVar[list | None] = contextvars.ContextVar("test_statements", default=None)
+
+def _count_statement(*_):
+    # Context vars follow sync endpoints into the threadpool, so only this request's
+    # statements are counted (not e.g. the known-emails loader thread)
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class _StatementCounter:
+    def __init__(self, app):
+        self.app = app
+        self.last = 0
+
+    async def __call__(self, scope, receive, send):
+        counter = [0]
+        token = _statements.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statements.reset(token)
+            self.last = counter[0]
+
+
+@pytest.fixture
+def counted(db):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    counter = _StatementCounter(app)
+    try:
+        with TestClient(counter) as client:
+            yield client, counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_statement)
+
+
+@pytest.mark.parametrize("name", list(CALLS))
+def test_statement_budget(name, counted, db, user):
+    client, counter = counted
+    todos = services.create_todos(db, [schema.TodoCreate(title=f"Todo {n}") for n in range(3)], user["id"])
+    method, path, kwargs = CALLS[name]
+
+    r = client.request(method, path.format(todo_id=todos[0]["id"]), headers=user["headers"], **kwargs)
+    assert r.status_code < 400, r.text
+
+    budget = BUDGETS.get(get_engine().dialect.name, BUDGETS["sqlite"])[name]
+    assert counter.last <= budget, f"{method} {path} ran {counter.last} statements, budget {budget}"
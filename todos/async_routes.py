@@ -0,0 +1,293 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session, get_async_db, get_async_read_db, is_sticky
+from core.config import Settings
+from core.etag import make_etag, is_not_modified, not_modified
+from core.metrics import InstrumentedRoute
+from core.responses import FastJSONResponse
+from .events import stream_response
+from . import schema, transfer
+from . import async_services as services
+from auth.schema import Principal, StreamToken
+from auth.services import get_current_admin_async, get_current_principal, get_stream_principal
+from auth.utils import create_stream_token
+from users.schema import UserItem
+
+router = APIRouter(prefix="/todos", tags=["todos"], route_class=InstrumentedRoute)
+
+
+@router.get("/", response_model=schema.TodoListResponse, status_code=status.HTTP_200_OK)
+async def get_todos(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(10, ge=1, le=100),
+    completed: Optional[bool] = None,
+    title_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    order: schema.SortOrder = "asc",
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. `id,title,completed` (`id` is always included)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Cheap version probe first: an unchanged list is answered without querying or serializing it
+    version = await services.get_todo_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, sorted(request.query_params.multi_items()))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    try:
+        todos, next_cursor = await services.get_todos(
+            db,
+            user_id=current_user.id,
+            cursor=cursor,
+            limit=limit,
+            completed=completed,
+            title_prefix=title_prefix,
+            order=order,
+            fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    # Plain dicts from our own database: encoded directly, response_model only documents the shape
+    return FastJSONResponse({"todos": todos, "next_cursor": next_cursor}, headers={"ETag": etag})
+
+
+# Search, stats, stream, export/import and batch routes are registered before /{todo_id} so their paths are not parsed as an id
+
+@router.get("/search", response_model=schema.TodoSearchResponse, status_code=status.HTTP_200_OK)
+async def search_todos(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match; each also matches as a prefix"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    version = await services.get_todo_version(db, current_user.id)
+    etag = make_etag(current_user.id, version, sorted(request.query_params.multi_items()))
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    try:
+        todos, next_cursor = await services.search_todos(db, current_user.id, q, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return FastJSONResponse({"todos": todos, "next_cursor": next_cursor}, headers={"ETag": etag})
+
+
+@router.get("/stats", response_model=schema.TodoStats, status_code=status.HTTP_200_OK)
+async def get_todo_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # One primary-key lookup on the per-user counters, however many todos there are
+    stats = await services.get_todo_stats(db, current_user.id)
+    etag = make_etag(current_user.id, stats.pop("version"), "stats")
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(stats, headers={"ETag": etag})
+
+
+@router.get("/stream", summary="Server-Sent Events feed of changes to your todos")
+async def stream_todos(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_stream_principal)
+):
+    # Authorization header, or ?token= from /stream/token for a browser EventSource
+    async with async_session() as db:
+        version = await services.get_todo_version(db, current_user.id)
+    return stream_response(request, current_user.id, last_event_id, version)
+
+
+@router.post(
+    "/stream/token",
+    response_model=StreamToken,
+    summary="Short-lived token for opening the change feed from a browser EventSource"
+)
+async def stream_token(current_user: Principal = Depends(get_current_principal)):
+    return {"token": create_stream_token(current_user), "expires_in": Settings.TODO_STREAM_TOKEN_SECONDS}
+
+
+@router.get("/export", summary="Download all your todos as NDJSON or CSV")
+async def export_todos(
+    request: Request,
+    format: schema.TransferFormat = "ndjson",
+    current_user: Principal = Depends(get_current_principal)
+):
+    # Rows are encoded chunk by chunk as the client reads them; memory stays flat however many todos
+    return transfer.export_response(
+        transfer.export_stream_async(current_user.id, format, primary=is_sticky(request)), format, f"todos-{current_user.id}"
+    )
+
+
+@router.get("/export/all", summary="Download every user's todos (admin only)")
+async def export_all_todos(
+    format: schema.TransferFormat = "ndjson",
+    _: UserItem = Depends(get_current_admin_async)
+):
+    return transfer.export_response(transfer.export_stream_async(None, format), format, "todos-all")
+
+
+@router.post("/import", response_model=schema.TodoImportResult, status_code=status.HTTP_201_CREATED)
+async def import_todos(
+    request: Request,
+    format: schema.TransferFormat = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    # The body is parsed as it arrives and inserted in chunks, all in one transaction
+    try:
+        imported = await transfer.import_todos_async(db, current_user.id, request.stream(), format)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {"imported": imported}
+
+
+@router.post("/batch", response_model=schema.TodoBatchResponse, status_code=status.HTTP_200_OK)
+async def create_todos(
+    batch: schema.TodoBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        results = await services.create_todos(db, batch.items, user_id=current_user.id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.patch("/batch", response_model=schema.TodoBatchResponse, status_code=status.HTTP_200_OK)
+async def update_todos(
+    batch: schema.TodoBatchUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        results = await services.update_todos(db, batch.items, user_id=current_user.id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.delete("/batch", response_model=schema.TodoBatchResponse, status_code=status.HTTP_200_OK)
+async def delete_todos(
+    batch: schema.TodoBatchDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        results = await services.delete_todos(db, batch.ids, user_id=current_user.id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/{todo_id}", response_model=schema.TodoItem, status_code=status.HTTP_200_OK)
+async def get_todo(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        todo = await services.get_todo(db, todo_id, user_id=current_user.id)
+        if not todo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Todo with id {todo_id} not found."
+            )
+        etag = make_etag(todo.id, todo.updated_at)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return todo
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.post("/", response_model=schema.TodoItem, status_code=status.HTTP_201_CREATED)
+async def create_todo(
+    todo: schema.TodoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        new_todo = await services.create_todo(db, todo, user_id=current_user.id)
+        return new_todo
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.put("/{todo_id}", response_model=schema.TodoItem, status_code=status.HTTP_200_OK)
+async def update_todo(
+    todo_id: int,
+    todo: schema.TodoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        updated_todo = await services.update_todo(db, todo_id, todo, user_id=current_user.id)
+        if not updated_todo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Todo with id {todo_id} not found."
+            )
+        return updated_todo
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_todo(
+    todo_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    try:
+        deleted = await services.delete_todo(db, todo_id, user_id=current_user.id)
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Todo with id {todo_id} not found."
+            )
+        return {"detail": "Todo deleted successfully."}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -0,0 +1,47 @@
+from operator import itemgetter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.pagination import page
+from . import models, schema
+from . import services
+from .services import todos_query, todo_version_query
+
+async def get_todo(db: AsyncSession, todo_id: int, user_id: int):
+    result = await db.execute(
+        select(models.Todo).where(models.Todo.id == todo_id, models.Todo.user_id == user_id, models.live)
+    )
+    return result.scalars().first()
+
+async def get_todos(db: AsyncSession, user_id: int, cursor: str | None = None, limit: int = 10, **filters):
+    result = await db.execute(todos_query(user_id, cursor, limit, **filters))
+    return page(map(dict, result.mappings()), limit, key=itemgetter("id"))
+
+async def get_todo_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(todo_version_query(user_id)) or 0
+
+async def get_todo_stats(db: AsyncSession, user_id: int) -> dict:
+    return await db.run_sync(services.get_todo_stats, user_id)
+
+async def search_todos(db: AsyncSession, user_id: int, q: str, cursor: str | None = None, limit: int = 10):
+    return await db.run_sync(services.search_todos, user_id, q, cursor, limit)
+
+# Writes are one or two statements with no Python work in between (see
+# services._write_returning), so the sync implementations run as-is
+
+async def create_todo(db: AsyncSession, todo: schema.TodoCreate, user_id: int):
+    return await db.run_sync(services.create_todo, todo, user_id)
+
+async def update_todo(db: AsyncSession, todo_id: int, todo: schema.TodoUpdate, user_id: int):
+    return await db.run_sync(services.update_todo, todo_id, todo, user_id)
+
+async def delete_todo(db: AsyncSession, todo_id: int, user_id: int):
+    return await db.run_sync(services.delete_todo, todo_id, user_id)
+
+async def create_todos(db: AsyncSession, todos: list[schema.TodoCreate], user_id: int):
+    return await db.run_sync(services.create_todos, todos, user_id)
+
+async def update_todos(db: AsyncSession, todos: list[schema.TodoBatchUpdateItem], user_id: int):
+    return await db.run_sync(services.update_todos, todos, user_id)
+
+async def delete_todos(db: AsyncSession, todo_ids: list[int], user_id: int):
+    return await db.run_sync(services.delete_todos, todo_ids, user_id)
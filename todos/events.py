@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Protocol
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from core.config import Settings
+
+# Change feed for todos. Write services publish one event per committed transaction;
+# the event id is the user's todo version (see services.bump_todo_state), so ids are
+# monotonic per user across every worker and clients can resume with Last-Event-ID.
+
+class EventBroker(Protocol):
+    # Carries events between workers. start() is called once with the local dispatcher,
+    # which the broker must call for every event published anywhere (including here).
+
+    def start(self, deliver: Callable[[dict], None]) -> None: ...
+
+    def publish(self, event: dict) -> None: ...
+
+
+class InProcessBroker:
+    def start(self, deliver: Callable[[dict], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, event: dict) -> None:
+        self._deliver(event)
+
+
+class _Subscriber:
+    __slots__ = ("loop", "queue")
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=Settings.TODO_EVENTS_QUEUE_SIZE)
+
+    def push(self, event: dict | None) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream, the client resumes from its last id
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class TodoEventHub:
+    def __init__(self, broker: EventBroker):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[_Subscriber]] = {}
+        self._recent: OrderedDict[int, deque] = OrderedDict()
+        # In-process consumers (e.g. the search index) called with every event, from any thread
+        self.listeners: list[Callable[[dict], None]] = []
+        self.set_broker(broker)
+
+    def set_broker(self, broker: EventBroker) -> None:
+        self.broker = broker
+        broker.start(self.dispatch)
+
+    def publish(self, user_id: int, version: int, kind: str, todos: list[dict]) -> None:
+        self.broker.publish({"id": version, "user_id": user_id, "type": kind, "todos": todos})
+
+    def dispatch(self, event: dict) -> None:
+        # May be called from a threadpool worker or a broker thread, never assume the loop
+        user_id = event["user_id"]
+        with self._lock:
+            recent = self._recent.get(user_id)
+            if recent is None:
+                recent = self._recent[user_id] = deque(maxlen=Settings.TODO_EVENTS_REPLAY_SIZE)
+                while len(self._recent) > Settings.TODO_EVENTS_MAX_USERS:
+                    self._recent.popitem(last=False)
+            else:
+                self._recent.move_to_end(user_id)
+            recent.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for listener in self.listeners:
+            listener(event)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+
+    def subscribe(self, user_id: int, last_event_id: int | None, version: int) -> tuple[_Subscriber, list[dict], bool]:
+        # Returns the subscriber, the events to replay, and whether the client missed
+        # events we no longer hold (and so must refetch its list). `version` is the user's
+        # todo version read before subscribing; anything newer reaches this hub's buffer.
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            recent = list(self._recent.get(user_id, ()))
+        if last_event_id is None:
+            return subscriber, [], False
+        replay = [event for event in recent if event["id"] > last_event_id]
+        # Up to date is never a gap, even on a worker that holds no events for the user
+        gap = last_event_id < version and (not recent or recent[0]["id"] > last_event_id + 1)
+        return subscriber, replay, gap
+
+    def unsubscribe(self, user_id: int, subscriber: _Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+
+hub = TodoEventHub(InProcessBroker())
+
+def _format(event: dict) -> str:
+    data = json.dumps({"type": event["type"], "todos": event["todos"]}, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+def stream_response(request: Request, user_id: int, last_event_id: str | None, version: int) -> StreamingResponse:
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+
+    async def events():
+        subscriber, replay, gap = hub.subscribe(user_id, last_id, version)
+        try:
+            if gap:
+                yield "event: resync\ndata: {}\n\n"
+            for event in replay:
+                yield _format(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), Settings.TODO_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield _format(event)
+        finally:
+            hub.unsubscribe(user_id, subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,14 +1,62 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, func, literal_column, text
 from sqlalchemy.orm import relationship
 from core.database import Base
 
+LIVE = text("deleted_at IS NULL")
+DELETED = text("deleted_at IS NOT NULL")
+
 class Todo(Base):
     __tablename__ = 'todos'
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, index=True)
-    description = Column(String, index=True)
+    title = Column(String)
+    description = Column(String)
     completed = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Soft delete: set by the delete endpoints, the row is hard-deleted later by the purge job
+    deleted_at = Column(DateTime, nullable=True)
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user = relationship("User", back_populates="todos")
+
+    # Keyset pagination walks (user_id, id); the completed filter gets its own covering index.
+    # (user_id, id) stays whole because the user purge and the FK cascade look rows up by
+    # user_id whether deleted or not; the others only cover live rows, so reads must carry
+    # `deleted_at IS NULL` (see `live`) to use them.
+    __table_args__ = (
+        Index("ix_todos_user_id_id", "user_id", "id"),
+        Index(
+            "ix_todos_user_id_completed_id", "user_id", "completed", "id",
+            postgresql_where=LIVE, sqlite_where=LIVE
+        ),
+        Index("ix_todos_deleted_at", "deleted_at", postgresql_where=DELETED, sqlite_where=DELETED),
+    )
+
+
+# Full-text search document: title words outrank description words. Queries must use this
+# exact expression for Postgres to pick the GIN index. Other databases skip the index and
+# search through todos.search instead.
+def _weighted(column, weight: str):
+    vector = func.to_tsvector(literal_column("'simple'::regconfig"), func.coalesce(column, literal_column("''")))
+    return func.setweight(vector, literal_column(f"'{weight}'::\"char\""))
+
+search_document = _weighted(Todo.title, "A").op("||")(_weighted(Todo.description, "B"))
+
+Index("ix_todos_search", search_document, postgresql_using="gin", postgresql_where=LIVE).ddl_if(dialect="postgresql")
+
+live = Todo.deleted_at.is_(None)
+
+
+class UserTodoState(Base):
+    # One row per user, bumped by every todo write so list ETags need a single PK lookup,
+    # plus the counters behind GET /todos/stats (see services.bump_todo_state)
+    __tablename__ = 'user_todo_state'
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime, nullable=True)
+    last_created_at = Column(DateTime, nullable=True)
+    last_completed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,91 @@
+"""Recompute the per-user todo counters (user_todo_state) from the todos table.
+
+    python -m todos.reconcile --chunk 1000
+
+The write paths keep the counters current. Run this after bulk imports or manual SQL, once
+after upgrading (users who already had todos start from zero), or whenever /todos/stats
+looks off. Users are processed in id order, one short transaction per chunk. A write that
+races a chunk can leave that user off until the next run.
+"""
+import argparse
+import time
+from sqlalchemy import case, exists, func, literal, or_, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from core.database import SessionLocal
+from todos.models import Todo, UserTodoState, live
+from users.models import User
+
+_state = UserTodoState
+
+def reconcile_chunk(db: Session, after_id: int, chunk: int) -> tuple[list[int], int]:
+    # Returns the user ids handled (none when done) and how many of them were corrected
+    # Deleted users are skipped: their todos and counters are on their way out (users.purge)
+    user_ids = db.scalars(
+        select(User.id).where(User.id > after_id, User.deleted_at.is_(None)).order_by(User.id).limit(chunk)
+    ).all()
+    if not user_ids:
+        return [], 0
+    first, last = user_ids[0], user_ids[-1]
+
+    counts = (
+        select(
+            Todo.user_id,
+            func.count().label("total"),
+            func.coalesce(func.sum(case((Todo.completed, 1), else_=0)), 0).label("completed"),
+        )
+        .join(User, User.id == Todo.user_id)
+        .where(Todo.user_id.between(first, last), live, User.deleted_at.is_(None))
+        .group_by(Todo.user_id)
+        .subquery()
+    )
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    # The WHERE keeps SQLite from reading ON CONFLICT as part of the SELECT
+    upsert = dialect.insert(_state).from_select(
+        ["user_id", "version", "total", "completed"],
+        select(counts.c.user_id, literal(1), counts.c.total, counts.c.completed).where(true())
+    )
+    # Only rows that were actually off are touched; their version moves so cached stats
+    # ETags are dropped (and change-feed clients see a gap and resync)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[_state.user_id],
+        set_={"total": upsert.excluded.total, "completed": upsert.excluded.completed, "version": _state.version + 1},
+        where=or_(_state.total != upsert.excluded.total, _state.completed != upsert.excluded.completed),
+    )
+    fixed = db.execute(upsert).rowcount
+
+    emptied = db.execute(
+        update(_state)
+        .where(
+            _state.user_id.in_(user_ids),
+            or_(_state.total != 0, _state.completed != 0),
+            ~exists().where(Todo.user_id == _state.user_id, live),
+        )
+        .values(total=0, completed=0, version=_state.version + 1)
+    ).rowcount
+    db.commit()
+    return user_ids, max(fixed, 0) + emptied
+
+def reconcile(chunk: int = 1000) -> tuple[int, int]:
+    # Returns (users scanned, users corrected)
+    after_id, scanned, corrected = 0, 0, 0
+    while True:
+        with SessionLocal() as db:
+            user_ids, fixed = reconcile_chunk(db, after_id, chunk)
+        if not user_ids:
+            return scanned, corrected
+        scanned += len(user_ids)
+        corrected += fixed
+        after_id = user_ids[-1]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=1000, help="users per transaction")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    scanned, corrected = reconcile(args.chunk)
+    print(f"Reconciled {scanned} users, corrected {corrected}, in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
+from core.config import Settings
+
+SortOrder = Literal["asc", "desc"]
+TransferFormat = Literal["ndjson", "csv"]
 
 class TodoItem(BaseModel):
     id: int
@@ -27,6 +32,52 @@ class TodoUpdate(BaseModel):
 
 class TodoListResponse(BaseModel):
     todos: List[TodoItem]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+class TodoImportItem(TodoCreate):
+    # Exported rows carry id (and user_id for admin exports); they are ignored, ids are new
+    completed: bool = False
+
+class TodoImportResult(BaseModel):
+    imported: int
+
+class TodoStats(BaseModel):
+    total: int
+    completed: int
+    open: int
+    last_activity_at: Optional[datetime] = None
+    last_created_at: Optional[datetime] = None
+    last_completed_at: Optional[datetime] = None
+
+class TodoSearchHit(TodoItem):
+    rank: float
+
+class TodoSearchResponse(BaseModel):
+    todos: List[TodoSearchHit]
+    next_cursor: Optional[str] = None
+
+# ─────── Batch ───────
+
+class TodoBatchCreate(BaseModel):
+    items: List[TodoCreate] = Field(..., min_length=1, max_length=Settings.TODO_BATCH_MAX_ITEMS)
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBatchUpdate(BaseModel):
+    items: List[TodoBatchUpdateItem] = Field(..., min_length=1, max_length=Settings.TODO_BATCH_MAX_ITEMS)
+
+class TodoBatchDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=Settings.TODO_BATCH_MAX_ITEMS)
+
+class TodoBatchResult(BaseModel):
+    id: Optional[int] = None
+    status: int
+    todo: Optional[TodoItem] = None
+    detail: Optional[str] = None
+
+class TodoBatchResponse(BaseModel):
+    results: List[TodoBatchResult]
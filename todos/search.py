@@ -0,0 +1,136 @@
+import re
+import threading
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.config import Settings
+from . import models
+from .events import hub
+
+# In-process inverted index for databases without full-text search (SQLite). Postgres
+# searches the tsvector GIN index instead (see services.search_todos).
+#
+# A user's todos are loaded on their first search and then kept current from the change
+# feed: every event carries the user's todo version, so an index that missed an event
+# (a gap in versions) is dropped and rebuilt on the next search. The feed only carries this
+# worker's writes, so each search also checks the user's current version: an index behind
+# it (a write from another worker or process) is rebuilt before searching.
+
+_WORD = re.compile(r"[^\W_]+")
+MAX_TERMS = 8
+
+# Same weighting as the Postgres search document: title words outrank description words
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+def terms(text: str | None) -> list[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+def query_terms(q: str) -> list[str]:
+    return list(dict.fromkeys(terms(q)))[:MAX_TERMS]
+
+
+class _UserIndex:
+    __slots__ = ("version", "postings", "docs")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.postings: dict[str, dict[int, float]] = {}  # term -> {todo id: weight}
+        self.docs: dict[int, set[str]] = {}  # todo id -> its terms, for removal
+
+    def add(self, todo_id: int, title: str | None, description: str | None) -> None:
+        self.remove(todo_id)
+        weights: dict[str, float] = {}
+        for term in terms(description):
+            weights[term] = DESCRIPTION_WEIGHT
+        for term in terms(title):
+            weights[term] = TITLE_WEIGHT
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[todo_id] = weight
+        self.docs[todo_id] = set(weights)
+
+    def remove(self, todo_id: int) -> None:
+        for term in self.docs.pop(todo_id, ()):
+            posting = self.postings[term]
+            posting.pop(todo_id, None)
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query: list[str]) -> list[tuple[int, float]]:
+        # Every query term must prefix-match some word of the todo (like to_tsquery 'a:* & b:*').
+        # Per-user vocabularies are small, so prefix matching scans them.
+        scores: dict[int, float] | None = None
+        for prefix in query:
+            matches: dict[int, float] = {}
+            for term, posting in self.postings.items():
+                if term.startswith(prefix):
+                    for todo_id, weight in posting.items():
+                        if weight > matches.get(todo_id, 0):
+                            matches[todo_id] = weight
+            if scores is None:
+                scores = matches
+            else:
+                scores = {todo_id: score + matches[todo_id] for todo_id, score in scores.items() if todo_id in matches}
+            if not scores:
+                return []
+        return sorted((scores or {}).items(), key=lambda hit: (-hit[1], hit[0]))
+
+
+class InvertedIndex:
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: OrderedDict[int, _UserIndex] = OrderedDict()
+
+    def _load(self, db: Session, user_id: int) -> _UserIndex:
+        # Version first: anything committed after it arrives as a newer event and is re-applied
+        version = db.scalar(
+            select(models.UserTodoState.version).where(models.UserTodoState.user_id == user_id)
+        ) or 0
+        index = _UserIndex(version)
+        rows = db.execute(
+            select(models.Todo.id, models.Todo.title, models.Todo.description)
+            .where(models.Todo.user_id == user_id, models.live)
+        )
+        for todo_id, title, description in rows:
+            index.add(todo_id, title, description)
+        return index
+
+    def search(self, db: Session, user_id: int, query: list[str], version: int) -> list[tuple[int, float]]:
+        # `version` is the user's current todo version (services.get_todo_version)
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                self._users.move_to_end(user_id)
+        if index is None or index.version < version:
+            index = self._load(db, user_id)
+            with self._lock:
+                current = self._users.get(user_id)
+                if current is None or current.version < index.version:
+                    self._users[user_id] = current = index
+                index = current
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        with self._lock:
+            return index.search(query)
+
+    def apply(self, event: dict) -> None:
+        with self._lock:
+            index = self._users.get(event["user_id"])
+            if index is None or event["id"] <= index.version:
+                return
+            # A gap, or a bulk import that carries no rows: rebuild on the next search
+            if event["id"] > index.version + 1 or event["type"] == "imported":
+                del self._users[event["user_id"]]
+                return
+            index.version = event["id"]
+            for todo in event["todos"]:
+                if event["type"] == "deleted":
+                    index.remove(todo["id"])
+                else:
+                    index.add(todo["id"], todo["title"], todo["description"])
+
+
+local_index = InvertedIndex(Settings.SEARCH_INDEX_MAX_USERS)
+hub.listeners.append(local_index.apply)
@@ -1,31 +1,312 @@
+from operator import itemgetter
+from datetime import datetime
+from sqlalchemy import DateTime, case, cast, select, insert, update, func, literal, literal_column, null, true
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from . import models, schema
+from core.database import SessionLocal
+from core.fields import sparse_columns
+from core.pagination import keyset, page, encode_offset_cursor, decode_offset_cursor
+from . import models, schema, search
+from .events import hub
+
+# Reads and writes select exactly the TodoItem columns and hand back plain dicts
+_todos = models.Todo.__table__
+_TODO_COLUMNS = (_todos.c.id, _todos.c.title, _todos.c.description, _todos.c.completed)
 
 def get_todo(db: Session, todo_id: int, user_id: int):
-    return db.query(models.Todo).filter(models.Todo.id == todo_id, models.Todo.user_id == user_id).first()
+    return db.query(models.Todo).filter(models.Todo.id == todo_id, models.Todo.user_id == user_id, models.live).first()
+
+def todo_version_query(user_id: int):
+    return select(models.UserTodoState.version).where(models.UserTodoState.user_id == user_id)
+
+def get_todo_version(db: Session, user_id: int) -> int:
+    return db.scalar(todo_version_query(user_id)) or 0
+
+def current_todo_version(user_id: int) -> int:
+    # For the change feed, which holds no session: a short one on the primary, so replica
+    # lag can't make an up-to-date client look behind or a behind one look current
+    with SessionLocal() as db:
+        return get_todo_version(db, user_id)
+
+# ─────── Per-user state ───────
+# user_todo_state holds the todo version (ETags, change feed ids) and the counters behind
+# GET /todos/stats. Every write adjusts it by deltas in the same transaction, so stats never
+# count todos; todos.reconcile recomputes it in bulk if it ever drifts.
+
+_state = models.UserTodoState
+
+def _upsert_state(stmt):
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[_state.user_id],
+        set_={
+            "version": _state.version + 1,
+            "total": _state.total + excluded.total,
+            "completed": _state.completed + excluded.completed,
+            "last_activity_at": excluded.last_activity_at,
+            "last_created_at": func.coalesce(excluded.last_created_at, _state.last_created_at),
+            "last_completed_at": func.coalesce(excluded.last_completed_at, _state.last_completed_at),
+        }
+    ).returning(_state.version)
+
+def bump_todo_state(db: Session, user_id: int, total: int = 0, completed: int = 0, newly_completed: int = 0) -> int:
+    # Part of the caller's transaction, so version and counters move exactly when the todos do
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    now = datetime.utcnow()
+    stmt = dialect.insert(_state).values(
+        user_id=user_id,
+        version=1,
+        total=total,
+        completed=completed,
+        last_activity_at=now,
+        last_created_at=now if total > 0 else None,
+        last_completed_at=now if newly_completed else None,
+    )
+    return db.scalar(_upsert_state(stmt))
+
+def _counter_deltas(kind: str, rows: list[dict]) -> tuple[int, int, int]:
+    # (total, completed, newly completed) for rows carrying `completed` (+ `was_completed` for updates)
+    done = sum(1 for row in rows if row["completed"])
+    if kind == "created":
+        return len(rows), done, 0
+    if kind == "deleted":
+        return -len(rows), -done, 0
+    was = sum(1 for row in rows if row["was_completed"])
+    newly = sum(1 for row in rows if row["completed"] and not row["was_completed"])
+    return 0, done - was, newly
+
+def _counter_delta_columns(kind: str, changed):
+    # _counter_deltas as aggregates over a data-modifying CTE, for the single-statement path
+    done = func.count().filter(changed.c.completed)
+    if kind == "created":
+        return func.count(), done, literal(0)
+    if kind == "deleted":
+        return -func.count(), -done, literal(0)
+    newly = func.count().filter(changed.c.completed & ~changed.c.was_completed)
+    return literal(0), done - func.count().filter(changed.c.was_completed), newly
+
+def get_todo_stats(db: Session, user_id: int) -> dict:
+    row = db.execute(
+        select(
+            _state.version, _state.total, _state.completed,
+            _state.last_activity_at, _state.last_created_at, _state.last_completed_at
+        ).where(_state.user_id == user_id)
+    ).mappings().first()
+    if row is None:
+        return {"version": 0, "total": 0, "completed": 0, "open": 0,
+                "last_activity_at": None, "last_created_at": None, "last_completed_at": None}
+    return {**row, "open": row["total"] - row["completed"]}
+
+def todos_query(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = 10,
+    completed: bool | None = None,
+    title_prefix: str | None = None,
+    order: schema.SortOrder = "asc",
+    fields: str | None = None,
+):
+    stmt = select(*sparse_columns(_TODO_COLUMNS, fields)).where(models.Todo.user_id == user_id, models.live)
+    if completed is not None:
+        stmt = stmt.where(models.Todo.completed == completed)
+    if title_prefix:
+        stmt = stmt.where(models.Todo.title.startswith(title_prefix, autoescape=True))
+    return keyset(stmt, models.Todo.id, cursor, limit, descending=order == "desc")
+
+def get_todos(db: Session, user_id: int, cursor: str | None = None, limit: int = 10, **filters):
+    rows = db.execute(todos_query(user_id, cursor, limit, **filters)).mappings()
+    return page(map(dict, rows), limit, key=itemgetter("id"))
+
+# ─────── Search ───────
+# Postgres matches and ranks with the tsvector GIN index (models.search_document); other
+# databases use the in-process inverted index in todos.search. Ranked results page by offset.
+
+def search_todos(db: Session, user_id: int, q: str, cursor: str | None = None, limit: int = 10):
+    query = search.query_terms(q)
+    if not query:
+        raise ValueError("Search query must contain at least one word")
+    offset = decode_offset_cursor(cursor) if cursor else 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(f"{term}:*" for term in query))
+        rank = func.ts_rank(models.search_document, tsquery)
+        stmt = (
+            select(*_TODO_COLUMNS, rank.label("rank"))
+            .where(models.Todo.user_id == user_id, models.live, models.search_document.op("@@")(tsquery))
+            .order_by(rank.desc(), models.Todo.id)
+            .offset(offset)
+            .limit(limit + 1)
+        )
+        rows = [dict(row) for row in db.execute(stmt).mappings()]
+        more, rows = len(rows) > limit, rows[:limit]
+    else:
+        version = get_todo_version(db, user_id)
+        hits = search.local_index.search(db, user_id, query, version)[offset:offset + limit + 1]
+        more, ranks = len(hits) > limit, dict(hits[:limit])
+        found = db.execute(
+            select(*_TODO_COLUMNS).where(models.Todo.user_id == user_id, models.live, models.Todo.id.in_(list(ranks)))
+        ).mappings()
+        rows = sorted(
+            ({**row, "rank": ranks[row["id"]]} for row in found),
+            key=lambda row: (-row["rank"], row["id"])
+        )
 
-def get_todos(db: Session, user_id:int, skip: int = 0, limit: int = 10):
-    return db.query(models.Todo).filter(models.Todo.user_id == user_id).offset(skip).limit(limit).all()
+    return rows, encode_offset_cursor(offset + limit) if more else None
+
+# ─────── Writes ───────
+# Every write is one DML statement with RETURNING, so nothing is re-selected afterwards.
+# On Postgres the state bump rides along in the same statement as a data-modifying CTE;
+# elsewhere it is a second statement in the same transaction.
+
+def _update_returning(db: Session, scope, values: dict):
+    # UPDATE ... RETURNING the new row plus `was_completed`, which the counters need. On
+    # Postgres the old value comes from a locking CTE in the same statement; elsewhere it is
+    # read first (and only when `completed` changes at all). Returns (stmt, pre-read values).
+    stmt = update(_todos).values(**values).execution_options(synchronize_session=False)
+    if "completed" not in values:
+        return stmt.where(*scope).returning(*_TODO_COLUMNS, _todos.c.completed.label("was_completed")), None
+    if db.get_bind().dialect.name == "postgresql":
+        old = select(_todos.c.id, _todos.c.completed).where(*scope).with_for_update().cte("old")
+        stmt = stmt.where(_todos.c.id == old.c.id)
+        return stmt.returning(*_TODO_COLUMNS, old.c.completed.label("was_completed")), None
+    was = dict(db.execute(select(_todos.c.id, _todos.c.completed).where(*scope)).all())
+    return stmt.where(*scope).returning(*_TODO_COLUMNS), was
+
+def _strip(kind: str, rows: list[dict]) -> list[dict]:
+    # Drop the bookkeeping columns before rows are returned or published
+    for row in rows:
+        row.pop("was_completed", None)
+        if kind == "deleted":
+            row.pop("completed", None)
+    return rows
+
+def _write_returning(db: Session, stmt, user_id: int, kind: str, was: dict | None = None) -> tuple[list[dict], int | None]:
+    if db.get_bind().dialect.name != "postgresql":
+        rows = [dict(row) for row in db.execute(stmt).mappings()]
+        if was is not None:
+            for row in rows:
+                row["was_completed"] = was.get(row["id"], row["completed"])
+        version = bump_todo_state(db, user_id, *_counter_deltas(kind, rows)) if rows else None
+        return _strip(kind, rows), version
+
+    changed = stmt.cte("changed")
+    total, completed, newly = _counter_delta_columns(kind, changed)
+    now = literal(datetime.utcnow(), DateTime())
+    source = (
+        select(
+            literal(user_id), literal(1), total, completed, now,
+            now if kind == "created" else cast(null(), DateTime()),
+            case((newly > 0, now), else_=cast(null(), DateTime())),
+        )
+        .select_from(changed)
+        .having(func.count() > 0)
+    )
+    bumped = _upsert_state(
+        postgresql.insert(_state).from_select(
+            ["user_id", "version", "total", "completed", "last_activity_at", "last_created_at", "last_completed_at"],
+            source
+        )
+    ).cte("bumped")
+    result = db.execute(select(changed, bumped.c.version).select_from(changed.join(bumped, true())))
+    rows = [dict(row) for row in result.mappings()]
+    version = rows[0]["version"] if rows else None
+    for row in rows:
+        row.pop("version")
+    return _strip(kind, rows), version
 
 def create_todo(db: Session, todo: schema.TodoCreate, user_id: int):
-    db_todo = models.Todo(**todo.dict(), user_id=user_id)
-    db.add(db_todo)
+    stmt = insert(_todos).values(**todo.dict(), user_id=user_id).returning(*_TODO_COLUMNS)
+    rows, version = _write_returning(db, stmt, user_id, "created")
     db.commit()
-    db.refresh(db_todo)
-    return db_todo
+    hub.publish(user_id, version, "created", rows)
+    return rows[0]
 
 def update_todo(db: Session, todo_id: int, todo: schema.TodoUpdate, user_id: int):
-    db_todo = db.query(models.Todo).filter(models.Todo.id == todo_id, models.Todo.user_id == user_id).first()
-    if db_todo:
-        for key, value in todo.dict(exclude_unset=True).items():
-            setattr(db_todo, key, value,)
-        db.commit()
-        db.refresh(db_todo)
-    return db_todo
+    values = todo.dict(exclude_unset=True)
+    scope = (_todos.c.id == todo_id, _todos.c.user_id == user_id, models.live)
+    if not values:
+        row = db.execute(select(*_TODO_COLUMNS).where(*scope)).mappings().first()
+        return dict(row) if row else None
+    stmt, was = _update_returning(db, scope, values)
+    rows, version = _write_returning(db, stmt, user_id, "updated", was)
+    db.commit()
+    if rows:
+        hub.publish(user_id, version, "updated", rows)
+    return rows[0] if rows else None
+
+def _soft_delete(*scope):
+    # Deletes only mark the row; the todos.purge_deleted job removes it later in chunks
+    return update(_todos).where(*scope, models.live).values(deleted_at=datetime.utcnow())
 
 def delete_todo(db: Session, todo_id: int, user_id: int):
-    db_todo = db.query(models.Todo).filter(models.Todo.id == todo_id, models.Todo.user_id == user_id).first()
-    if db_todo:
-        db.delete(db_todo)
-        db.commit()
-    return db_todo
+    stmt = _soft_delete(_todos.c.id == todo_id, _todos.c.user_id == user_id).returning(_todos.c.id, _todos.c.completed)
+    rows, version = _write_returning(db, stmt, user_id, "deleted")
+    db.commit()
+    if rows:
+        hub.publish(user_id, version, "deleted", rows)
+    return rows[0] if rows else None
+
+# ─────── Batch ───────
+# Each batch is a handful of set-based statements committed once, instead of a
+# commit + refresh per item.
+
+def create_todos(db: Session, todos: list[schema.TodoCreate], user_id: int):
+    rows = [{**todo.dict(), "completed": False, "user_id": user_id} for todo in todos]
+    stmt = insert(models.Todo).returning(*_TODO_COLUMNS, sort_by_parameter_order=True)
+    created = db.execute(stmt, rows).mappings().all()
+    version = bump_todo_state(db, user_id, *_counter_deltas("created", created))
+    db.commit()
+    hub.publish(user_id, version, "created", [dict(row) for row in created])
+    return [{"id": row["id"], "status": 201, "todo": dict(row)} for row in created]
+
+def update_todos(db: Session, todos: list[schema.TodoBatchUpdateItem], user_id: int):
+    # Items carrying identical changes collapse into a single UPDATE ... WHERE id IN (...)
+    groups: dict[tuple, list[int]] = {}
+    for todo in todos:
+        values = todo.dict(exclude_unset=True, exclude={"id"})
+        groups.setdefault(tuple(sorted(values.items())), []).append(todo.id)
+
+    updated = {}
+    changed = []
+    for values, ids in groups.items():
+        scope = (_todos.c.user_id == user_id, _todos.c.id.in_(ids), models.live)
+        if not values:
+            # Nothing to change, but the item must still exist for this user
+            found = db.execute(select(*_TODO_COLUMNS).where(*scope)).mappings()
+            updated.update((row["id"], dict(row)) for row in found)
+            continue
+        stmt, was = _update_returning(db, scope, dict(values))
+        for row in db.execute(stmt).mappings():
+            row = dict(row)
+            if was is not None:
+                row["was_completed"] = was.get(row["id"], row["completed"])
+            changed.append(row)
+    version = bump_todo_state(db, user_id, *_counter_deltas("updated", changed)) if changed else None
+    _strip("updated", changed)
+    updated.update((row["id"], row) for row in changed)
+    db.commit()
+    if changed:
+        hub.publish(user_id, version, "updated", changed)
+    return [
+        {"id": todo.id, "status": 200, "todo": updated[todo.id]} if todo.id in updated
+        else {"id": todo.id, "status": 404, "detail": f"Todo with id {todo.id} not found."}
+        for todo in todos
+    ]
+
+def delete_todos(db: Session, todo_ids: list[int], user_id: int):
+    stmt = (
+        _soft_delete(_todos.c.user_id == user_id, _todos.c.id.in_(todo_ids))
+        .returning(_todos.c.id, _todos.c.completed)
+        .execution_options(synchronize_session=False)
+    )
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    deleted = {row["id"] for row in rows}
+    version = bump_todo_state(db, user_id, *_counter_deltas("deleted", rows)) if rows else None
+    db.commit()
+    if deleted:
+        hub.publish(user_id, version, "deleted", [{"id": todo_id} for todo_id in sorted(deleted)])
+    return [
+        {"id": todo_id, "status": 204} if todo_id in deleted
+        else {"id": todo_id, "status": 404, "detail": f"Todo with id {todo_id} not found."}
+        for todo_id in todo_ids
+    ]
@@ -0,0 +1,201 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterator
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from core.config import Settings
+from core.database import ReadSessionLocal, async_read_session
+from users.models import User
+from . import schema
+from .schema import TransferFormat
+from .events import hub
+from .models import live
+from .services import _todos, _TODO_COLUMNS, bump_todo_state
+
+# Bulk export / import of todos in constant memory. Exports stream straight off a server-side
+# cursor (yield_per) one chunk of rows at a time; imports parse the request body as it
+# arrives and insert every TODO_IMPORT_CHUNK_ROWS rows, committing once at the end.
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# ─────── Export ───────
+
+def export_query(user_id: int | None):
+    # user_id None is the admin export of every live user's todos; a deleted user's todos
+    # stay in the table until users.purge gets to them
+    if user_id is None:
+        return (
+            select(_todos.c.user_id, *_TODO_COLUMNS)
+            .join(User, User.id == _todos.c.user_id)
+            .where(live, User.deleted_at.is_(None))
+            .order_by(_todos.c.id)
+        )
+    return select(*_TODO_COLUMNS).where(_todos.c.user_id == user_id, live).order_by(_todos.c.id)
+
+def _encode_chunk(fmt: TransferFormat, keys: list[str], rows) -> bytes:
+    if fmt == "ndjson":
+        return "".join(json.dumps(dict(zip(keys, row)), separators=(",", ":")) + "\n" for row in rows).encode()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+def _csv_header(keys: list[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(keys)
+    return buffer.getvalue().encode()
+
+def export_stream(user_id: int | None, fmt: TransferFormat, primary: bool = False) -> Iterator[bytes]:
+    # Owns its session: the response body is produced after the request's dependencies are
+    # gone. Starlette runs each step of this generator in the threadpool.
+    with ReadSessionLocal() as db:
+        if primary:
+            db.info["primary"] = True
+        stmt = export_query(user_id).execution_options(yield_per=Settings.TODO_EXPORT_CHUNK_ROWS)
+        result = db.execute(stmt)
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _csv_header(keys)
+        for rows in result.partitions():
+            yield _encode_chunk(fmt, keys, rows)
+
+async def export_stream_async(user_id: int | None, fmt: TransferFormat, primary: bool = False) -> AsyncIterator[bytes]:
+    async with async_read_session(primary) as db:
+        stmt = export_query(user_id).execution_options(yield_per=Settings.TODO_EXPORT_CHUNK_ROWS)
+        result = await db.stream(stmt)
+        keys = list(result.keys())
+        if fmt == "csv":
+            yield _csv_header(keys)
+        async for rows in result.partitions():
+            yield _encode_chunk(fmt, keys, rows)
+
+def export_response(stream, fmt: TransferFormat, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+# ─────── Import ───────
+
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # Complete lines as the body arrives; multi-byte characters may straddle network chunks
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in body:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def _records(body: AsyncIterator[bytes], fmt: TransferFormat) -> AsyncIterator[tuple[int, dict]]:
+    # (line number, raw record) pairs
+    if fmt == "ndjson":
+        number = 0
+        async for line in _lines(body):
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e.msg})") from e
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {number}: expected a JSON object")
+            yield number, record
+        return
+
+    # A quoted CSV field may contain newlines, so a record ends on a line that leaves the
+    # quotes balanced
+    header = None
+    record, start, number = "", 0, 0
+    async for line in _lines(body):
+        number += 1
+        record = f"{record}\n{line}" if record else line
+        start = start or number
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        line_number, start = start, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = values
+            continue
+        yield line_number, dict(zip(header, values))
+    if record:
+        raise ValueError(f"Line {start}: unterminated quoted field")
+
+def _validate(number: int, record: dict, user_id: int, fmt: TransferFormat) -> dict:
+    if fmt == "csv" and record.get("description") == "":
+        # CSV has no null; an empty cell round-trips an exported null description
+        record["description"] = None
+    try:
+        item = schema.TodoImportItem.model_validate(record)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise ValueError(f"Line {number}: {field}: {error['msg']}") from e
+    return {**item.dict(), "user_id": user_id}
+
+async def _chunks(body: AsyncIterator[bytes], fmt: TransferFormat, user_id: int) -> AsyncIterator[list[dict]]:
+    chunk, total = [], 0
+    async for number, record in _records(body, fmt):
+        total += 1
+        if total > Settings.TODO_IMPORT_MAX_ROWS:
+            raise ValueError(f"Imports are limited to {Settings.TODO_IMPORT_MAX_ROWS} todos")
+        chunk.append(_validate(number, record, user_id, fmt))
+        if len(chunk) >= Settings.TODO_IMPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _finish_import(db: Session, user_id: int, total: int, completed: int) -> int:
+    version = bump_todo_state(db, user_id, total, completed)
+    db.commit()
+    return version
+
+async def import_todos(db: Session, user_id: int, body: AsyncIterator[bytes], fmt: TransferFormat) -> int:
+    # One transaction: either every row lands or none does. The sync session is only ever
+    # used from one threadpool call at a time.
+    total = completed = 0
+    try:
+        async for rows in _chunks(body, fmt, user_id):
+            await run_in_threadpool(db.execute, insert(_todos), rows)
+            total += len(rows)
+            completed += sum(1 for row in rows if row["completed"])
+        if not total:
+            return 0
+        version = await run_in_threadpool(_finish_import, db, user_id, total, completed)
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+    # Too many rows for the change feed; listeners refetch instead
+    hub.publish(user_id, version, "imported", [])
+    return total
+
+async def import_todos_async(db: AsyncSession, user_id: int, body: AsyncIterator[bytes], fmt: TransferFormat) -> int:
+    total = completed = 0
+    try:
+        async for rows in _chunks(body, fmt, user_id):
+            await db.execute(insert(_todos), rows)
+            total += len(rows)
+            completed += sum(1 for row in rows if row["completed"])
+        if not total:
+            return 0
+        version = await db.run_sync(_finish_import, user_id, total, completed)
+    except BaseException:
+        await db.rollback()
+        raise
+    hub.publish(user_id, version, "imported", [])
+    return total
@@ -0,0 +1,219 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Settings
+from core.database import get_async_db, get_async_read_db
+from core.metrics import InstrumentedRoute
+from core.responses import FastJSONResponse
+from users.schema import (
+    UserCreate,
+    UserItem,
+    UserListResponse,
+    UserUpdate,
+    ResetPasswordIn
+)
+from users.async_services import (
+    create_user,
+    list_users,
+    get_user,
+    admin_invite_user,
+    update_user,
+    delete_user,
+    reset_user_password,
+    generate_password_reset,
+    admin_password_reset
+)
+from auth.services import get_current_user_async, get_current_admin_async
+from users.models import Role
+from mailer.services import enqueue_email
+from pydantic import EmailStr
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=InstrumentedRoute)
+
+# ─────── Public / Self-Service ───────
+
+@router.post(
+    "/",
+    response_model=UserItem,
+    status_code=status.HTTP_201_CREATED,
+    summary="Register yourself as a new user"
+)
+async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # A taken email comes back from the service as a 400
+    user = await create_user(db, user_in, role=Role.user)
+    return user
+
+@router.get(
+    "/me",
+    response_model=UserItem,
+    summary="Get your own profile"
+)
+async def read_own_profile(current_user=Depends(get_current_user_async)):
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return current_user
+
+# ─────── Admin‑Only ───────
+
+@router.get(
+    "/",
+    response_model=UserListResponse,
+    summary="[Admin] List users",
+)
+async def admin_list_users(
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(100, ge=1, le=Settings.USERS_PAGE_MAX),
+    role: Role | None = None,
+    order: Literal["asc", "desc"] = "asc",
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. `id,email` (`id` is always included)"),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    try:
+        users, next_cursor = await list_users(db, cursor=cursor, limit=limit, role=role, order=order, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"users": users, "next_cursor": next_cursor})
+
+@router.get(
+    "/{user_id}",
+    response_model=UserItem,
+    summary="[Admin] Get user by ID"
+)
+async def admin_get_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    user = await get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.post(
+    "/invite",
+    response_model=UserItem,
+    summary="[Admin] Invite a new user (create an admin user)"
+)
+async def invite_user(
+    user_in: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    admin_user = await admin_invite_user(db, user_in)
+    return admin_user
+
+@router.patch(
+    "/{user_id}",
+    response_model=UserItem,
+    summary="[Admin] Update user fields / role"
+)
+async def admin_update_user(
+    user_id: int,
+    user_in: UserUpdate,
+    role: Role | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    updated = await update_user(db, user_id, user_in, role=role)
+    if not updated:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated
+
+@router.delete(
+    "/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="[Admin] Delete a user"
+)
+async def admin_delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    success = await delete_user(db, user_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found")
+    return
+
+@router.post(
+    "/forgot-password",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Request a password reset link via email"
+)
+async def forgot_password(
+    email: EmailStr,
+    db: AsyncSession = Depends(get_async_db)
+):
+    reset_data = await generate_password_reset(db, email)
+    if reset_data:
+        # Compose the HTML body
+        html = f"""
+        <p>Hello {reset_data['full_name'] or reset_data['email']},</p>
+        <p>You requested a password reset. Click the link below to set a new password:</p>
+        <p><a href="{reset_data['reset_link']}">Reset your password</a></p>
+        <p>This link expires in 15 minutes.</p>
+        """
+        # Queue for the delivery worker; repeats for one address collapse into one email
+        await db.run_sync(
+            enqueue_email,
+            reset_data["email"],
+            "Reset your password",
+            html,
+            f"pwd-reset:{reset_data['email']}"
+        )
+
+    # Same answer whether or not a message was queued (unknown address, or one sent moments
+    # ago), so the endpoint doesn't reveal which addresses are registered
+    return {"msg": "If that email exists, a reset link has been sent."}
+
+@router.post(
+    "/reset-password",
+    response_model=dict,
+    summary="Reset your password using a token"
+)
+async def reset_password(
+    data: ResetPasswordIn,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Service will raise HTTPException on invalid token or missing user
+    await reset_user_password(db, data.token, data.new_password)
+    return {"msg": "Password has been reset successfully."}
+
+@router.post(
+    "/{user_id}/reset-password",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="[Admin] Trigger password‑reset email for a user"
+)
+async def admin_reset_password(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    _: UserItem = Depends(get_current_admin_async)
+):
+    reset_data = await admin_password_reset(db, user_id)
+
+    html = f"""
+    <p>Hello {reset_data['full_name'] or reset_data['email']},</p>
+    <p>An administrator has requested a password reset for your account.
+    Click the link below to choose a new password:</p>
+    <p><a href="{reset_data['reset_link']}">Reset your password</a></p>
+    <p>This link expires in 15 minutes.</p>
+    """
+
+    # Keyed apart from self-service requests, so a user's own recent request can't swallow it
+    message = await db.run_sync(
+        enqueue_email,
+        reset_data["email"],
+        "Your password reset request",
+        html,
+        f"pwd-reset-admin:{reset_data['email']}"
+    )
+    if message is None:
+        # Sent moments ago: say so rather than report a send that never happens
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A password reset email was already sent to this user; try again later."
+        )
+
+    return {"msg": "Password reset email queued."}
@@ -0,0 +1,96 @@
+from operator import itemgetter
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from users.models import User, Role, by_email
+from users.schema import UserCreate, UserUpdate
+from auth.hashing import hash_password_async
+from auth.utils import create_password_reset_token, verify_password_reset_token
+from core.config import Settings
+from auth.cache import user_cache
+from auth.revocation import revoke_user
+from core.pagination import page
+from users import services
+from users.services import users_query
+
+# bcrypt is CPU bound, so hashing is awaited on the hash pool instead of run on the event loop
+
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    result = await db.execute(select(User).where(by_email(email)))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user_in: UserCreate, role: Role = Role.user) -> dict:
+    await db.run_sync(services.ensure_email_available, user_in.email)
+    hashed = await hash_password_async(user_in.password)
+    return await db.run_sync(services.insert_user, user_in, hashed, role)
+
+async def admin_invite_user(db: AsyncSession, user_in: UserCreate) -> dict:
+    return await create_user(db, user_in, role=Role.admin)
+
+async def get_user(db: AsyncSession, user_id: int) -> User | None:
+    return await db.run_sync(services.get_user, user_id)
+
+async def list_users(db: AsyncSession, cursor: str | None = None, limit: int = 100, **filters) -> tuple[list[dict], str | None]:
+    result = await db.execute(users_query(cursor, limit, **filters))
+    return page(map(dict, result.mappings()), limit, key=itemgetter("id"))
+
+async def update_user(
+    db: AsyncSession,
+    user_id: int,
+    user_in: UserUpdate,
+    role: Role | None = None
+) -> dict | None:
+    data = user_in.dict(exclude_unset=True)
+    hashed = await hash_password_async(data["password"]) if data.get("password") else None
+    return await db.run_sync(services.apply_user_update, user_id, services.user_update_values(data, hashed, role))
+
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    return await db.run_sync(services.delete_user, user_id)
+
+async def generate_password_reset(db: AsyncSession, email: str) -> dict | None:
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    token = create_password_reset_token(user.email)
+    reset_link = f"{Settings.FRONTEND_URL}/reset-password?token={token}"
+    return {
+        "email": user.email,
+        "full_name": user.full_name,
+        "reset_link": reset_link
+    }
+
+async def reset_user_password(db: AsyncSession, token: str, new_password: str):
+
+    # 1. Verify token and extract email
+    email = verify_password_reset_token(token)
+    if not email:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid or expired reset token")
+
+    # 2. Fetch the user
+    user = await get_user_by_email(db, email)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
+
+    # 3. Hash & update
+    user.hashed_password = await hash_password_async(new_password)
+    revoke_user(user.id)
+    await db.commit()
+    user_cache.invalidate(email)
+    return user
+
+async def admin_password_reset(db: AsyncSession, user_id: int) -> dict:
+    user = await get_user(db, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
+
+    token = create_password_reset_token(user.email)
+    reset_link = f"{Settings.FRONTEND_URL}/reset-password?token={token}"
+
+    return {
+        "email": user.email,
+        "full_name": user.full_name,
+        "reset_link": reset_link
+    }
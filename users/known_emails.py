@@ -0,0 +1,63 @@
+import threading
+from collections import defaultdict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.bloom import BloomFilter
+from core.config import Settings
+from core.database import ReadSessionLocal
+from core.metrics import registry
+from users.models import User, by_email, live, normalize_email
+
+# Bloom filter of registered emails, so a signup for a taken address is turned away before
+# it pays for a bcrypt hash. A miss means the address is certainly free and the signup goes
+# straight to the INSERT; a hit is confirmed with one lookup on ix_users_email_lower.
+#
+# Each worker fills its filter from the users table in a background thread on first use
+# (until then every check is confirmed in the database) and adds the emails it registers
+# itself. Signups on other workers are not seen, so those duplicates fall through to the
+# unique index, which stays the source of truth.
+
+class KnownEmails:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.checks: dict[str, int] = defaultdict(int)
+        self._filter: BloomFilter | None = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _start(self) -> BloomFilter:
+        with self._lock:
+            if self._filter is None:
+                self._filter = BloomFilter(self.capacity, self.error_rate)
+                threading.Thread(target=self._load, name="known-emails", daemon=True).start()
+            return self._filter
+
+    def _load(self) -> None:
+        with ReadSessionLocal() as db:
+            emails = db.scalars(select(User.email).where(live).execution_options(yield_per=10000))
+            for email in emails:
+                self._filter.add(normalize_email(email))
+        self._ready = True
+
+    def add(self, email: str) -> None:
+        self._start().add(normalize_email(email))
+
+    def is_registered(self, db: Session, email: str) -> bool:
+        bloom = self._start()
+        if self._ready and normalize_email(email) not in bloom:
+            self.checks["bloom_miss"] += 1
+            return False
+        taken = db.scalar(select(User.id).where(by_email(email))) is not None
+        self.checks["taken" if taken else ("free" if self._ready else "loading")] += 1
+        return taken
+
+
+known_emails = KnownEmails(Settings.SIGNUP_BLOOM_CAPACITY, Settings.SIGNUP_BLOOM_ERROR_RATE)
+
+def _collect_known_email_metrics():
+    # "free" counts Bloom false positives: a hit the database then found unregistered
+    for outcome, count in list(known_emails.checks.items()):
+        yield "signup_email_checks_total", f'outcome="{outcome}"', count
+
+registry.collectors.append(_collect_known_email_metrics)
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Enum
+from sqlalchemy import Column, DateTime, Integer, String, Enum, Index, and_, func, text
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -11,10 +11,34 @@ class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, nullable=False, index=True)
+    # Stored lowercased (normalize_email); unique through ix_users_email_lower below
+    email = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
     role = Column(Enum(Role), default=Role.user, nullable=False)
+    # Soft delete: the account is gone for every read at once, and the purge job removes
+    # its todos in chunks and then the row (see users.services.delete_user)
+    deleted_at = Column(DateTime, nullable=True)
 
-    todos = relationship("Todo", back_populates="user", cascade="all, delete")
+    # The database cascades (ON DELETE CASCADE); the ORM never loads them to delete them
+    todos = relationship("Todo", back_populates="user", passive_deletes=True)
+    todo_state = relationship("UserTodoState", uselist=False, passive_deletes=True)
 
+    # Tokens identify users by id and purged rows are really deleted, so an id must never
+    # be handed out twice (SQLite reuses the highest rowid without AUTOINCREMENT)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+# Case-insensitive uniqueness among live accounts (a deleted user's address can sign up
+# again): signups rely on it instead of checking first, and every lookup goes through
+# by_email() so it matches this exact expression and predicate and uses the index
+_LIVE = text("deleted_at IS NULL")
+Index("ix_users_email_lower", func.lower(User.email), unique=True, postgresql_where=_LIVE, sqlite_where=_LIVE)
+
+live = User.deleted_at.is_(None)
+
+def by_email(email: str):
+    return and_(func.lower(User.email) == normalize_email(email), live)
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
-from core.database import get_db
+from core.config import Settings
+from core.database import get_db, get_read_db
+from core.metrics import InstrumentedRoute
+from core.responses import FastJSONResponse
 from users.schema import (
     UserCreate,
     UserItem,
@@ -21,11 +25,11 @@ from users.services import (
     admin_password_reset
 )
 from auth.services import get_current_user, get_current_admin
-from users.models import Role, User
-from utils.email import send_email
+from users.models import Role
+from mailer.services import enqueue_email
 from pydantic import EmailStr
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=InstrumentedRoute)
 
 # ─────── Public / Self-Service ───────
 
@@ -36,8 +40,7 @@ router = APIRouter(prefix="/users", tags=["users"])
     summary="Register yourself as a new user"
 )
 def signup(user_in: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_in.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
+    # A taken email comes back from the service as a 400
     user = create_user(db, user_in, role=Role.user)
     return user
 
@@ -59,13 +62,19 @@ def read_own_profile(current_user=Depends(get_current_user)):
     summary="[Admin] List users",
 )
 def admin_list_users(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(100, ge=1, le=Settings.USERS_PAGE_MAX),
+    role: Role | None = None,
+    order: Literal["asc", "desc"] = "asc",
+    fields: str | None = Query(None, description="Comma-separated fields to return, e.g. `id,email` (`id` is always included)"),
+    db: Session = Depends(get_read_db),
     _: UserItem = Depends(get_current_admin)
 ):
-    users = list_users(db, skip=skip, limit=limit)
-    return {"users": users}
+    try:
+        users, next_cursor = list_users(db, cursor=cursor, limit=limit, role=role, order=order, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"users": users, "next_cursor": next_cursor})
 
 @router.get(
     "/{user_id}",
@@ -74,7 +83,7 @@ def admin_list_users(
 )
 def admin_get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: UserItem = Depends(get_current_admin)
 ):
     user = get_user(db, user_id)
@@ -93,8 +102,6 @@ def invite_user(
     db: Session = Depends(get_db),
     _: UserItem = Depends(get_current_admin)
 ):
-    if db.query(User).filter(User.email == user_in.email).first():
-      raise HTTPException(status_code=400, detail="Email already registered")
     admin_user = admin_invite_user(db, user_in)
     return admin_user
 
@@ -137,7 +144,6 @@ def admin_delete_user(
 )
 def forgot_password(
     email: EmailStr,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     reset_data = generate_password_reset(db, email)
@@ -149,15 +155,17 @@ def forgot_password(
         <p><a href="{reset_data['reset_link']}">Reset your password</a></p>
         <p>This link expires in 15 minutes.</p>
         """
-        # Schedule the email send in background
-        background_tasks.add_task(
-            send_email,
+        # Queue for the delivery worker; repeats for one address collapse into one email
+        enqueue_email(
+            db,
             reset_data["email"],
             "Reset your password",
-            html
+            html,
+            dedup_key=f"pwd-reset:{reset_data['email']}"
         )
 
-    # Always return success response
+    # Same answer whether or not a message was queued (unknown address, or one sent moments
+    # ago), so the endpoint doesn't reveal which addresses are registered
     return {"msg": "If that email exists, a reset link has been sent."}
 
 @router.post(
@@ -180,7 +188,6 @@ def reset_password(
 )
 def admin_reset_password(
     user_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _: UserItem = Depends(get_current_admin)
 ):
@@ -194,11 +201,19 @@ def admin_reset_password(
     <p>This link expires in 15 minutes.</p>
     """
 
-    background_tasks.add_task(
-        send_email,
+    # Keyed apart from self-service requests, so a user's own recent request can't swallow it
+    message = enqueue_email(
+        db,
         reset_data["email"],
         "Your password reset request",
-        html
+        html,
+        dedup_key=f"pwd-reset-admin:{reset_data['email']}"
     )
+    if message is None:
+        # Sent moments ago: say so rather than report a send that never happens
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A password reset email was already sent to this user; try again later."
+        )
 
-    return {"msg": "Password reset email sent if user exists."}
+    return {"msg": "Password reset email queued."}
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, field_validator
 from typing import Optional, List
+from users.models import normalize_email
 
 class UserItem(BaseModel):
     id: int
@@ -15,6 +16,11 @@ class UserCreate(BaseModel):
     full_name: Optional[str] = Field(None, max_length=100)
     password: str = Field(..., min_length=8)
 
+    @field_validator("email")
+    @classmethod
+    def _normalize_email(cls, email: str) -> str:
+        return normalize_email(email)
+
     class Config:
         from_attributes = True
 
@@ -23,6 +29,11 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = Field(None, max_length=100)
     password: Optional[str] = Field(None, min_length=8)
 
+    @field_validator("email")
+    @classmethod
+    def _normalize_email(cls, email: str | None) -> str | None:
+        return normalize_email(email) if email else email
+
     class Config:
         from_attributes = True
 
@@ -35,6 +46,7 @@ class ResetPasswordIn(BaseModel):
 
 class UserListResponse(BaseModel):
     users: List[UserItem]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -1,65 +1,150 @@
+from operator import itemgetter
+from datetime import datetime
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from users.models import User, Role
+from core.fields import sparse_columns
+from core.pagination import keyset, page
+from users.models import User, Role, by_email, live, normalize_email
 from users.schema import UserCreate, UserUpdate
 from auth.utils import get_password_hash, create_password_reset_token, verify_password_reset_token
 from core.config import Settings
+from auth.cache import user_cache
+from auth.revocation import revoke_user
+from users.known_emails import known_emails
+from jobs.services import enqueue
 from fastapi import HTTPException, status
 
-def create_user(db: Session, user_in: UserCreate, role: Role = Role.user) -> User:
-    hashed = get_password_hash(user_in.password)
-    db_user = User(
-        email=user_in.email,
+# Signups are a single INSERT: a taken email is caught by the unique index on lower(email),
+# and known_emails turns most of those away before the bcrypt hash.
+#
+# Lists and writes select exactly the UserItem columns and hand back plain dicts; writes
+# use INSERT/UPDATE ... RETURNING instead of commit + refresh. Hashing stays outside so
+# the async path can await it first.
+_USER_COLUMNS = (User.id, User.email, User.full_name, User.role)
+
+def _email_taken() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+
+def ensure_email_available(db: Session, email: str) -> None:
+    # Cheap screen before hashing; the unique index in insert_user is what actually decides
+    if known_emails.is_registered(db, email):
+        raise _email_taken()
+
+def insert_user(db: Session, user_in: UserCreate, hashed: str, role: Role = Role.user) -> dict:
+    stmt = insert(User).values(
+        email=normalize_email(user_in.email),
         hashed_password=hashed,
         full_name=user_in.full_name,
         role=role
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    ).returning(*_USER_COLUMNS)
+    try:
+        row = db.execute(stmt).mappings().one()
+        db.commit()
+    except IntegrityError:
+        # ix_users_email_lower: registered meanwhile, or on a worker whose signups we don't see
+        db.rollback()
+        known_emails.add(user_in.email)
+        raise _email_taken()
+    known_emails.add(row["email"])
+    return dict(row)
+
+def create_user(db: Session, user_in: UserCreate, role: Role = Role.user) -> dict:
+    ensure_email_available(db, user_in.email)
+    return insert_user(db, user_in, get_password_hash(user_in.password), role)
 
-def admin_invite_user(db: Session, user_in: UserCreate) -> User:
+def admin_invite_user(db: Session, user_in: UserCreate) -> dict:
     return create_user(db, user_in, role=Role.admin)
 
 def get_user(db: Session, user_id: int) -> User | None:
-    return db.query(User).get(user_id)
+    return db.query(User).filter(User.id == user_id, live).first()
+
+def users_query(
+    cursor: str | None = None,
+    limit: int = 100,
+    role: Role | None = None,
+    order: str = "asc",
+    fields: str | None = None,
+):
+    stmt = select(*sparse_columns(_USER_COLUMNS, fields)).where(live)
+    if role:
+        stmt = stmt.where(User.role == role)
+    return keyset(stmt, User.id, cursor, limit, descending=order == "desc")
 
-def list_users(db: Session, skip: int = 0, limit: int = 100) -> list[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+def list_users(db: Session, cursor: str | None = None, limit: int = 100, **filters) -> tuple[list[dict], str | None]:
+    rows = db.execute(users_query(cursor, limit, **filters)).mappings()
+    return page(map(dict, rows), limit, key=itemgetter("id"))
+
+def user_update_values(data: dict, hashed: str | None, role: Role | None = None) -> dict:
+    values = {}
+    if hashed:
+        values["hashed_password"] = hashed
+    if data.get("email"):
+        values["email"] = normalize_email(data["email"])
+    if data.get("full_name") is not None:
+        values["full_name"] = data["full_name"]
+    if role:
+        values["role"] = role
+    return values
+
+def apply_user_update(db: Session, user_id: int, values: dict) -> dict | None:
+    stale_emails = []
+    if "email" in values:
+        # The old address is only needed to evict it from the user cache
+        old_email = db.scalar(select(User.email).where(User.id == user_id, live))
+        if old_email is None:
+            return None
+        stale_emails.append(old_email)
+
+    if values:
+        stmt = update(User).where(User.id == user_id, live).values(**values).returning(*_USER_COLUMNS)
+    else:
+        stmt = select(*_USER_COLUMNS).where(User.id == user_id, live)
+    try:
+        row = db.execute(stmt).mappings().first()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _email_taken()
+    if not row:
+        return None
+    if "email" in values:
+        known_emails.add(row["email"])
+    if "hashed_password" in values:
+        # Tokens carry the principal; a new password has to end the old credential's sessions
+        revoke_user(user_id)
+    user_cache.invalidate(*stale_emails, row["email"])
+    return dict(row)
 
 def update_user(
     db: Session,
     user_id: int,
     user_in: UserUpdate,
     role: Role | None = None
-) -> User | None:
-    user = get_user(db, user_id)
-    if not user:
-        return None
-
+) -> dict | None:
     data = user_in.dict(exclude_unset=True)
-    if data.get("password"):
-        user.hashed_password = get_password_hash(data.pop("password"))
-    if data.get("email"):
-        user.email = data["email"]
-    if data.get("full_name") is not None:
-        user.full_name = data["full_name"]
-    if role:
-        user.role = role
-
-    db.commit()
-    db.refresh(user)
-    return user
+    hashed = get_password_hash(data["password"]) if data.get("password") else None
+    return apply_user_update(db, user_id, user_update_values(data, hashed, role))
 
 def delete_user(db: Session, user_id: int) -> bool:
-    user = get_user(db, user_id)
-    if not user:
+    # One UPDATE however many todos the user has: every read filters on deleted_at, and the
+    # users.purge job removes the todos in chunks and then the row, off the request path.
+    # The job is enqueued in the same transaction, so a deleted user is always purged.
+    email = db.scalar(
+        update(User)
+        .where(User.id == user_id, live)
+        .values(deleted_at=datetime.utcnow())
+        .returning(User.email)
+    )
+    if email is None:
         return False
-    db.delete(user)
-    db.commit()
+    enqueue(db, "users.purge", {"user_id": user_id}, key=f"users.purge:{user_id}")
+    user_cache.invalidate(email)
+    revoke_user(user_id)
     return True
+
 def generate_password_reset(db: Session, email: str) -> dict | None:
-    user = db.query(User).filter(User.email == email).first()
+    user = db.query(User).filter(by_email(email)).first()
     if not user:
         return None
     token = create_password_reset_token(user.email)
@@ -79,17 +164,19 @@ def reset_user_password(db: Session, token: str, new_password: str):
                             detail="Invalid or expired reset token")
 
     # 2. Fetch the user
-    user = db.query(User).filter(User.email == email).first()
+    user = db.query(User).filter(by_email(email)).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found")
 
     # 3. Hash & update
     user.hashed_password = get_password_hash(new_password)
+    revoke_user(user.id)
     db.commit()
+    user_cache.invalidate(email)
     return user
 def admin_password_reset(db: Session, user_id: int) -> dict:
-    user = db.query(User).get(user_id)
+    user = get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found")
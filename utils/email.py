@@ -1,12 +1,17 @@
-import smtplib
 from email.mime.text import MIMEText
 from core.config import Settings
 
-def send_email(to: str, subject: str, html_body: str):
+def build_message(to: str, subject: str, html_body: str) -> MIMEText:
     msg = MIMEText(html_body, "html")
     msg["Subject"] = subject
     msg["From"] = Settings.EMAIL_FROM
     msg["To"] = to
+    return msg
+
+def send_email(to: str, subject: str, html_body: str):
+    # One-off send on a fresh connection; bulk traffic goes through the mailer outbox
+    import smtplib  # only this rare path needs it, keep it out of import time
+    msg = build_message(to, subject, html_body)
 
     with smtplib.SMTP(Settings.EMAIL_HOST, Settings.EMAIL_PORT) as server:
         server.starttls()